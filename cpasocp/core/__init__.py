@@ -8,4 +8,9 @@ from .proximal_offline_part import *
 from .proximal_online_part import *
 from .constraints_scaling import *
 from .l_bfgs import *
+from .anderson import *
+from .broyden import *
+from .offline_cache import *
 from .ocp_algorithms import *
+from .parametric_solver import *
+from .receding_horizon import *
@@ -0,0 +1,171 @@
+from math import hypot as hypot
+import numpy as np
+import scipy.linalg as linalg
+
+
+class AndersonAcceleration:
+    """
+    Anderson acceleration directions of a fixed-point iteration x = T x with residual r = x - T x
+
+    The last memory_num pairs of differences s = x' - x and y = r' - r are kept in preallocated ring buffers
+    together with a thin QR factorization Y = Q R, which is updated when a column is added or the oldest column
+    is dropped. The direction d = -r - (S - Y) gamma, with gamma = argmin ||Y gamma - r||, then costs O(n m).
+
+    The pairs are either the differences of successive iterates (update), which reuses the T evaluations of the
+    iteration itself, or given explicitly (add_difference).
+    """
+
+    def __init__(self, dimension, memory_num):
+        """
+        :param dimension: dimension (n) of the iterates
+        :param memory_num: number (m) of stored differences
+        """
+        if memory_num < 1:
+            raise ValueError("memory_num must be at least 1")
+        self.__n = dimension
+        self.__m = memory_num
+        self.__S = np.zeros((dimension, memory_num))
+        self.__Y = np.zeros((dimension, memory_num))
+        self.__Q = np.zeros((dimension, memory_num))
+        self.__R = np.zeros((memory_num, memory_num))
+        self.__columns = []  # ring buffer positions of the stored differences, oldest first
+        self.__next = 0  # ring buffer position of the next difference
+        self.__x_prev = np.zeros((dimension, 1))
+        self.__r_prev = np.zeros((dimension, 1))
+        self.__has_prev = False
+
+    # GETTERS
+    @property
+    def dimension(self):
+        return self.__n
+
+    @property
+    def memory_num(self):
+        return self.__m
+
+    @property
+    def num_columns(self):
+        """Number of differences currently stored"""
+        return len(self.__columns)
+
+    @property
+    def s_matrix(self):
+        """
+        :return: S, the stored differences of the iterates, oldest first
+        """
+        return self.__S[:, self.__columns]
+
+    @property
+    def y_matrix(self):
+        """
+        :return: Y, the stored differences of the residuals, oldest first
+        """
+        return self.__Y[:, self.__columns]
+
+    def reset(self):
+        """Forget all differences and the previous iterate"""
+        self.__columns = []
+        self.__next = 0
+        self.__has_prev = False
+        return self
+
+    def update(self, x, residual):
+        """
+        Store the differences between (x, residual) and the previous iterate
+
+        :param x: iterate x_k
+        :param residual: residual r_k = x_k - T x_k
+        """
+        x = np.reshape(x, (self.__n, 1))
+        residual = np.reshape(residual, (self.__n, 1))
+        if self.__has_prev:
+            self.add_difference(x - self.__x_prev, residual - self.__r_prev)
+        np.copyto(self.__x_prev, x)
+        np.copyto(self.__r_prev, residual)
+        self.__has_prev = True
+        return self
+
+    def add_difference(self, s, y):
+        """
+        Store a pair of differences directly, dropping the oldest pair if the memory is full
+
+        :param s: difference of two iterates x' - x
+        :param y: difference of their residuals r' - r
+        """
+        if len(self.__columns) == self.__m:
+            self.__drop_oldest()
+        position = self.__next
+        self.__S[:, position] = np.reshape(s, self.__n)
+        self.__Y[:, position] = np.reshape(y, self.__n)
+        if self.__add_column(position):
+            self.__columns.append(position)
+            self.__next = (position + 1) % self.__m
+        return self
+
+    def direction(self, residual):
+        """
+        :param residual: residual r_k = x_k - T x_k of the last update
+        :return: Anderson direction d_k, x_k + d_k is the accelerated iterate
+        """
+        residual = np.reshape(residual, (self.__n, 1))
+        k = len(self.__columns)
+        if k == 0:
+            return -residual
+        Q = self.__Q[:, 0: k]
+        Q_T_r = Q.T @ residual
+        gamma = linalg.solve_triangular(self.__R[0: k, 0: k], Q_T_r)
+        # Y gamma = Q Q_T r
+        return Q @ Q_T_r - residual - self.__S[:, self.__columns] @ gamma
+
+    def __add_column(self, position):
+        """
+        Append Y[:, position] to the QR factorization, by Gram-Schmidt with reorthogonalization
+
+        :return: False if the column is (numerically) linearly dependent on the stored ones and was not added
+        """
+        k = len(self.__columns)
+        y = self.__Y[:, position]
+        y_norm = np.linalg.norm(y)
+        q = y.copy()
+        self.__R[0: k, k] = 0
+        for _ in range(2):
+            h = self.__Q[:, 0: k].T @ q
+            q -= self.__Q[:, 0: k] @ h
+            self.__R[0: k, k] += h
+        q_norm = np.linalg.norm(q)
+        if q_norm <= 1e-10 * y_norm or y_norm == 0:
+            return False
+        np.divide(q, q_norm, out=self.__Q[:, k])
+        self.__R[k, k] = q_norm
+        return True
+
+    def __drop_oldest(self):
+        """Remove the first column of the QR factorization and restore the triangular R with Givens rotations"""
+        k = len(self.__columns)
+        R = self.__R
+        Q = self.__Q
+        R[0: k, 0: k - 1] = R[0: k, 1: k].copy()
+        for j in range(k - 1):
+            a = R[j, j]
+            b = R[j + 1, j]
+            r = hypot(a, b)
+            if r == 0:
+                continue
+            c = a / r
+            s = b / r
+            row_j = R[j, j: k - 1].copy()
+            R[j, j: k - 1] = c * row_j + s * R[j + 1, j: k - 1]
+            R[j + 1, j: k - 1] = c * R[j + 1, j: k - 1] - s * row_j
+            column_j = Q[:, j].copy()
+            Q[:, j] = c * column_j + s * Q[:, j + 1]
+            Q[:, j + 1] = c * Q[:, j + 1] - s * column_j
+        R[k - 1, :] = 0
+        R[:, k - 1] = 0
+        self.__columns.pop(0)
+
+    def __str__(self):
+        return f"AndersonAcceleration item; dimension: {self.__n}, memory: {self.__m}, " \
+               f"columns: {len(self.__columns)}"
+
+    def __repr__(self):
+        return f"AndersonAcceleration item; dimension: {self.__n}, memory: {self.__m}"
@@ -0,0 +1,125 @@
+import numpy as np
+
+
+class RestartedBroyden:
+    """
+    Modified restarted Broyden directions of a fixed-point iteration x = T x with residual r = x - T x
+
+    The inverse Jacobian estimate H_k = (I + u_{k-1} s_{k-1}') ... (I + u_0 s_0') is kept in the compact form
+    H_k = I + U_k C_k S_k', with S_k, U_k preallocated (n, m) matrices and C_k a lower triangular (m, m) matrix,
+    so H v costs two matrix-vector products with (n, k) matrices. After m updates the memory is restarted (H = I)
+    by resetting the number of stored pairs.
+
+    The pairs are either the differences of successive iterates (update), which needs no T evaluation besides
+    those of the iteration itself, or given explicitly (add_difference).
+    """
+
+    def __init__(self, dimension, memory_num, theta_bar=0.2):
+        """
+        :param dimension: dimension (n) of the iterates
+        :param memory_num: number (m) of updates before a restart
+        :param theta_bar: safeguard parameter of the modified (Powell) update, in (0, 1)
+        """
+        if memory_num < 1:
+            raise ValueError("memory_num must be at least 1")
+        self.__n = dimension
+        self.__m = memory_num
+        self.__theta_bar = theta_bar
+        self.__S = np.zeros((dimension, memory_num))
+        self.__U = np.zeros((dimension, memory_num))
+        self.__C = np.zeros((memory_num, memory_num))
+        self.__k = 0  # number of stored pairs
+        self.__x_prev = np.zeros((dimension, 1))
+        self.__r_prev = np.zeros((dimension, 1))
+        self.__has_prev = False
+
+    # GETTERS
+    @property
+    def dimension(self):
+        return self.__n
+
+    @property
+    def memory_num(self):
+        return self.__m
+
+    @property
+    def num_columns(self):
+        """Number of updates since the last restart"""
+        return self.__k
+
+    def reset(self):
+        """Restart, H = I, and forget the previous iterate"""
+        self.__k = 0
+        self.__has_prev = False
+        return self
+
+    def apply(self, vector):
+        """
+        :param vector: (n, 1) vector or (n, c) matrix v
+        :return: H v
+        """
+        k = self.__k
+        if k == 0:
+            return vector.copy()
+        return vector + self.__U[:, 0: k] @ (self.__C[0: k, 0: k] @ (self.__S[:, 0: k].T @ vector))
+
+    def update(self, x, residual):
+        """
+        Broyden update of H with the differences between (x, residual) and the previous iterate
+
+        :param x: iterate x_k
+        :param residual: residual r_k = x_k - T x_k
+        """
+        x = np.reshape(x, (self.__n, 1))
+        residual = np.reshape(residual, (self.__n, 1))
+        if self.__has_prev:
+            self.add_difference(x - self.__x_prev, residual - self.__r_prev)
+        np.copyto(self.__x_prev, x)
+        np.copyto(self.__r_prev, residual)
+        self.__has_prev = True
+        return self
+
+    def add_difference(self, s, y):
+        """
+        Broyden update of H with the pair (s, y), restarting first if m updates are stored
+
+        :param s: difference of two iterates x' - x
+        :param y: difference of their residuals r' - r
+        """
+        s = np.reshape(s, (self.__n, 1))
+        s_norm_2 = (s.T @ s).item()
+        if s_norm_2 == 0:
+            return self
+        if self.__k == self.__m:
+            self.__k = 0
+        k = self.__k
+        theta_bar = self.__theta_bar
+        s_tilde = self.apply(np.reshape(y, (self.__n, 1)))
+        gamma = (s_tilde.T @ s).item() / s_norm_2
+        if abs(gamma) >= theta_bar:
+            theta = 1
+        else:
+            theta = (1 - (1 if gamma >= 0 else -1) * theta_bar) / (1 - gamma)
+        u = self.__U[:, k]
+        np.subtract(s[:, 0], s_tilde[:, 0], out=u)
+        u *= theta / (1 - theta + theta * gamma) / s_norm_2
+        # H_{k+1} = (I + u s') H_k, i.e., C_{k+1} = [C_k, 0; s' U_k C_k, 1]
+        self.__C[k, 0: k] = (s.T @ self.__U[:, 0: k]) @ self.__C[0: k, 0: k]
+        self.__C[k, k] = 1
+        self.__C[0: k, k] = 0
+        self.__S[:, k] = s[:, 0]
+        self.__k = k + 1
+        return self
+
+    def direction(self, residual):
+        """
+        :param residual: residual r_k = x_k - T x_k
+        :return: Broyden direction d_k = -H r_k
+        """
+        return -self.apply(np.reshape(residual, (self.__n, 1)))
+
+    def __str__(self):
+        return f"RestartedBroyden item; dimension: {self.__n}, memory: {self.__m}, columns: {self.__k}"
+
+    def __repr__(self):
+        return f"RestartedBroyden item; dimension: {self.__n}, memory: {self.__m}"
@@ -1,6 +1,47 @@
+import collections
+import hashlib
 import numpy as np
 import scipy.sparse.linalg as lingalg
 
+# ||L|| of the most recently estimated operators, keyed by problem fingerprint, least recently used evicted first
+L_NORM_CACHE_SIZE = 16
+_L_NORM_CACHE = collections.OrderedDict()
+
+
+def problem_fingerprint(*items):
+    """
+    Hash of a sequence of scalars and arrays (shape, dtype and values), used as a cache key
+
+    :param items: scalars or arrays, e.g., (N, A, B, Gamma_x, Gamma_u, Gamma_N)
+    """
+    fingerprint = hashlib.sha1()
+    for item in items:
+        array = np.ascontiguousarray(item)
+        fingerprint.update(str(array.shape).encode())
+        fingerprint.update(str(array.dtype).encode())
+        fingerprint.update(array.tobytes())
+    return fingerprint.hexdigest()
+
+
+def is_identity_gamma(stage_state, stage_control, terminal_state):
+    """
+    Check whether the constraint matrices only select the states and inputs,
+    i.e., Gamma_x = [I; 0], Gamma_u = [0; I] and Gamma_N = I
+
+    In that case L is the identity on z (n_L = n_z), as built for 'Real' and 'Rectangle' constraints.
+
+    :param stage_state: matrix Gamma_x, describing the state constraints
+    :param stage_control: matrix Gamma_u, describing control constraints
+    :param terminal_state: matrix Gamma_N, describing terminal constraints
+    """
+    n_c, n_x = stage_state.shape
+    n_u = stage_control.shape[1]
+    if n_c != n_x + n_u or stage_control.shape[0] != n_c or terminal_state.shape != (n_x, n_x):
+        return False
+    return np.array_equal(stage_state, np.vstack((np.eye(n_x), np.zeros((n_u, n_x))))) \
+        and np.array_equal(stage_control, np.vstack((np.zeros((n_x, n_u)), np.eye(n_u)))) \
+        and np.array_equal(terminal_state, np.eye(n_x))
+
 
 class LinearOperator:
     def __init__(self, prediction_horizon, state_dynamics, control_dynamics, stage_state, stage_control,
@@ -19,62 +60,108 @@ class LinearOperator:
         self.__Gamma_x = stage_state
         self.__Gamma_u = stage_control
         self.__Gamma_N = terminal_state
+        self.__identity_structure = is_identity_gamma(stage_state, stage_control, terminal_state)
         self.make_L_op()
         self.make_L_adj()
 
-    def make_L_op(self):
-        """Construct LinearOperator L"""
+    def __dimensions(self):
         N = self.__prediction_horizon
-        Gamma_x = self.__Gamma_x
-        Gamma_u = self.__Gamma_u
-        Gamma_N = self.__Gamma_N
         n_x = self.__A.shape[1]
         n_u = self.__B.shape[1]
         n_c = self.__Gamma_x.shape[0]
         n_f = self.__Gamma_N.shape[0]
         n_z = (N + 1) * n_x + N * n_u
         n_L = N * n_c + n_f
+        return N, n_x, n_u, n_c, n_f, n_z, n_L
 
+    @property
+    def identity_structure(self):
+        """Whether Gamma_x = [I; 0], Gamma_u = [0; I] and Gamma_N = I, so that L is the identity on z"""
+        return self.__identity_structure
+
+    def __make_identity(self, n):
         def matvec(v):
-            L = Gamma_x @ v[0:n_x] + Gamma_u @ v[n_x: n_x + n_u]
-            L = np.reshape(L, (n_c, 1))
+            # no matmul, the result is a view of v
+            return np.reshape(v, (n, -1))
 
-            for i in range(1, N):
-                L_i = Gamma_x @ v[i * (n_x + n_u): i * (n_x + n_u) + n_x] + Gamma_u \
-                      @ v[i * (n_x + n_u) + n_x: (i + 1) * (n_x + n_u)]
-                L = np.vstack((L, np.reshape(L_i, (n_c, 1))))
+        return lingalg.LinearOperator((n, n), matvec=matvec, matmat=matvec)
 
-            L_N = Gamma_N @ v[N * (n_x + n_u): N * (n_x + n_u) + n_x]
-            L = np.vstack((L, np.reshape(L_N, (n_f, 1))))
-            return L
+    def make_L_norm(self, tol=1e-6, safety_margin=1e-4):
+        """
+        Estimate the operator norm ||L|| with Lanczos iterations on L_adj L (matrix-free)
 
-        return lingalg.LinearOperator((n_L, n_z), matvec=matvec)
+        The estimate is memoized per (N, A, B, Gamma) fingerprint for the last L_NORM_CACHE_SIZE plants, so repeated
+        builds on the same plant skip it.
+        With identity structure ||L|| = 1 is returned without iterating.
 
-    def make_L_adj(self):
-        """Construct LinearOperator adjoint L_adj"""
-        N = self.__prediction_horizon
+        :param tol: relative tolerance of the largest eigenvalue of L_adj L
+        :param safety_margin: relative margin added to the estimate, which approaches ||L|| from below
+        """
+        if self.__identity_structure:
+            return 1.0
+        key = problem_fingerprint(self.__prediction_horizon, self.__A, self.__B, self.__Gamma_x, self.__Gamma_u,
+                                  self.__Gamma_N, tol, safety_margin)
+        if key not in _L_NORM_CACHE:
+            n_z = self.__dimensions()[5]
+            L_adj_L = self.make_L_adj() @ self.make_L_op()
+            largest_eig = lingalg.eigsh(L_adj_L, k=1, which='LA', tol=tol, v0=np.ones(n_z),
+                                        return_eigenvectors=False)[0]
+            _L_NORM_CACHE[key] = np.sqrt(largest_eig) * (1 + safety_margin)
+            while len(_L_NORM_CACHE) > L_NORM_CACHE_SIZE:
+                _L_NORM_CACHE.popitem(last=False)
+        _L_NORM_CACHE.move_to_end(key)
+        return _L_NORM_CACHE[key]
+
+    def make_L_op(self):
+        """
+        Construct LinearOperator L
+
+        With identity structure (see is_identity_gamma) L returns a view of its argument.
+        """
+        N, n_x, n_u, n_c, n_f, n_z, n_L = self.__dimensions()
+        if self.__identity_structure:
+            return self.__make_identity(n_z)
         Gamma_x = self.__Gamma_x
         Gamma_u = self.__Gamma_u
         Gamma_N = self.__Gamma_N
-        n_x = self.__A.shape[1]
-        n_u = self.__B.shape[1]
-        n_c = self.__Gamma_x.shape[0]
-        n_f = self.__Gamma_N.shape[0]
-        n_z = (N + 1) * n_x + N * n_u
-        n_L = N * n_c + n_f
 
         def matvec(v):
-            L_adj_x = np.reshape(Gamma_x.T @ v[0:n_c], (n_x, 1))
-            L_adj_u = np.reshape(Gamma_u.T @ v[0:n_c], (n_u, 1))
-            L_adj = np.vstack((L_adj_x, L_adj_u))
+            # v is (n_z,), (n_z, 1) or (n_z, k); the stage view is (N, n_x + n_u, k)
+            v = np.reshape(v, (n_z, -1))
+            k = v.shape[1]
+            stages = v[0: N * (n_x + n_u)].reshape((N, n_x + n_u, k))
+            L = np.empty((n_L, k), dtype=np.result_type(Gamma_x, v))
+            L_stages = L[0: N * n_c].reshape((N, n_c, k))
+            np.matmul(Gamma_x, stages[:, 0: n_x], out=L_stages)
+            L_stages += Gamma_u @ stages[:, n_x: n_x + n_u]
+            np.matmul(Gamma_N, v[N * (n_x + n_u): n_z], out=L[N * n_c: n_L])
+            return L
 
-            for i in range(1, N):
-                L_adj_i_x = np.reshape(Gamma_x.T @ v[i * n_c: (i + 1) * n_c], (n_x, 1))
-                L_adj_i_u = np.reshape(Gamma_u.T @ v[i * n_c: (i + 1) * n_c], (n_u, 1))
-                L_adj = np.vstack((L_adj, L_adj_i_x, L_adj_i_u))
+        return lingalg.LinearOperator((n_L, n_z), matvec=matvec, matmat=matvec)
 
-            L_adj_N = np.reshape(Gamma_N.T @ v[N * n_c: N * n_c + n_f], (n_x, 1))
-            L_adj = np.vstack((L_adj, L_adj_N))
+    def make_L_adj(self):
+        """
+        Construct LinearOperator adjoint L_adj
+
+        With identity structure (see is_identity_gamma) L_adj returns a view of its argument.
+        """
+        N, n_x, n_u, n_c, n_f, n_z, n_L = self.__dimensions()
+        if self.__identity_structure:
+            return self.__make_identity(n_z)
+        Gamma_x_T = self.__Gamma_x.T
+        Gamma_u_T = self.__Gamma_u.T
+        Gamma_N_T = self.__Gamma_N.T
+
+        def matvec(v):
+            # v is (n_L,), (n_L, 1) or (n_L, k); the stage view is (N, n_c, k)
+            v = np.reshape(v, (n_L, -1))
+            k = v.shape[1]
+            stages = v[0: N * n_c].reshape((N, n_c, k))
+            L_adj = np.empty((n_z, k), dtype=np.result_type(Gamma_x_T, v))
+            L_adj_stages = L_adj[0: N * (n_x + n_u)].reshape((N, n_x + n_u, k))
+            np.matmul(Gamma_x_T, stages, out=L_adj_stages[:, 0: n_x])
+            np.matmul(Gamma_u_T, stages, out=L_adj_stages[:, n_x: n_x + n_u])
+            np.matmul(Gamma_N_T, v[N * n_c: n_L], out=L_adj[N * (n_x + n_u): n_z])
             return L_adj
 
-        return lingalg.LinearOperator((n_z, n_L), matvec=matvec)
+        return lingalg.LinearOperator((n_z, n_L), matvec=matvec, matmat=matvec)
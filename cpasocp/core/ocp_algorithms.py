@@ -1,7 +1,80 @@
+import collections
+import time
 import numpy as np
 import cpasocp.core.proximal_online_part as core_online
+import cpasocp.core.anderson as core_anderson
+import cpasocp.core.broyden as core_broyden
 from math import sqrt as sqrt
 
+# status of the last run of an algorithm
+STATUS_CONVERGED = 0
+STATUS_MAX_ITERATIONS = 1
+STATUS_TIME_BUDGET = 2
+STATUS_MESSAGES = {STATUS_CONVERGED: "converged",
+                   STATUS_MAX_ITERATIONS: "maximum number of iterations reached",
+                   STATUS_TIME_BUDGET: "time budget exceeded"}
+
+# maximum number of changes of rho in admm with adaptive_rho, after which rho is fixed so that ADMM converges
+ADMM_MAX_RHO_UPDATES = 50
+
+# restart schemes of chambolle_pock_accelerated, and the maximum number of restarts, after which the inertial
+# weights are nondecreasing as the convergence results of inertial Krasnosel'skii-Mann iterations require
+CP_RESTARTS = ("residual", "gradient")
+CP_MAX_RESTARTS = 100
+
+# maximum number of changes of the step sizes in chambolle_pock with adaptive_step, after which they are fixed,
+# and bound of the exponent k of the primal step size alpha * step_tau^k
+CP_MAX_STEP_UPDATES = 50
+CP_MAX_STEP_EXPONENT = 8
+
+
+def _project_columns(set_, matrix, out):
+    """
+    Project every column of matrix on set_, vectorized for Cartesian products, Rectangles, Balls and second order
+    cones, column by column for other sets
+    """
+    set_type = type(set_).__name__
+    if set_type == 'Cartesian':
+        set_.project_stacked(matrix, out=out)
+    elif set_type == 'Rectangle':
+        set_.project(matrix, out=out)
+    elif set_type in ('Ball', 'SecondOrderCone'):
+        set_.project_batch(matrix.T, out=out.T)
+    else:
+        for k in range(matrix.shape[1]):
+            set_.project(matrix[:, k: k + 1], out=out[:, k: k + 1])
+    return out
+
+
+def _norm_inf(x, axis=None):
+    """
+    Infinity norm max |x_i| (per column with axis=0), from the maximum and the minimum without the temporary |x|
+    """
+    return np.maximum(x.max(axis=axis), -x.min(axis=axis))
+
+
+def _norm_2(x):
+    """
+    Euclidean norm of an array, from the dot product of its flattened view without a temporary
+    """
+    x = x.ravel()
+    return sqrt(np.dot(x, x))
+
+
+class _FixedPointRecord:
+    """
+    Point x of the SuperMann iteration with T x, the fixed-point residual r = x - T x, L r_z and the norm of r in
+    the SuperMann metric; they are None until the point is evaluated
+    """
+    __slots__ = ("x", "T_x", "residual", "L_residual_z", "norm")
+
+    def __init__(self, x):
+        self.x = x
+        self.T_x = None
+        self.residual = None
+        self.L_residual_z = None
+        self.norm = None
+
 
 class Algorithms:
     """
@@ -17,10 +90,22 @@ class Algorithms:
         self.__z0 = None  # initial_guess_z
         self.__eta0 = None  # initial_guess_eta
         self.__epsilon = None
+        self.__epsilon_rel = 0.
+        self.__max_iters = 10000
+        self.__time_budget = None
+        self.__deadline = None
+        self.__check_every = 1
+        self.__num_checks = None
         self.__P_seq = None
         self.__R_tilde_seq = None
         self.__K_seq = None
         self.__A_bar_seq = None
+        self.__R_tilde_chol_seq = None
+        self.__K_R_seq = None
+        self.__A_bar_P_B_seq = None
+        self.__workspace = None
+        self.__proximal_offline_cache = None
+        self.__lambda_workspaces = collections.OrderedDict()  # online workspaces for proximal_lambda != alpha
         self.__Gamma_x = None  # stage_state
         self.__Gamma_u = None  # stage_input
         self.__Gamma_N = None  # terminal_state
@@ -35,8 +120,10 @@ class Algorithms:
         self.__scaling_factor = None
         self.__loop_time = None
         self.__z = None
-        self.__s_cache = None
-        self.__y_cache = None
+        self.__eta = None
+        self.__iterations = None
+        self.__anderson = None  # AndersonAcceleration of chambolle_pock_supermann
+        self.__broyden = None  # RestartedBroyden of chambolle_pock_supermann
         self.__r_safe = None
         self.__supermann_eta = None
 
@@ -50,6 +137,7 @@ class Algorithms:
     @prediction_horizon.setter
     def prediction_horizon(self, value):
         self.__N = value
+        self.__reset_workspaces()
 
     @property
     def state_dynamics(self):
@@ -61,6 +149,7 @@ class Algorithms:
     @state_dynamics.setter
     def state_dynamics(self, value):
         self.__A = value
+        self.__reset_workspaces()
 
     @property
     def control_dynamics(self):
@@ -72,6 +161,7 @@ class Algorithms:
     @control_dynamics.setter
     def control_dynamics(self, value):
         self.__B = value
+        self.__reset_workspaces()
 
     @property
     def control_weight(self):
@@ -83,6 +173,7 @@ class Algorithms:
     @control_weight.setter
     def control_weight(self, value):
         self.__R = value
+        self.__reset_workspaces()
 
     @property
     def initial_state(self):
@@ -120,7 +211,7 @@ class Algorithms:
     @property
     def epsilon(self):
         """
-        :return: epsilon: scalar (epsilon) of Chambolle-Pock algorithm
+        :return: epsilon: absolute tolerance (epsilon) of the termination criteria
         """
         return self.__epsilon
 
@@ -128,6 +219,59 @@ class Algorithms:
     def epsilon(self, value):
         self.__epsilon = value
 
+    @property
+    def epsilon_rel(self):
+        """
+        :return: epsilon_rel: relative tolerance of the termination criteria, a residual meets them if it is at most
+        epsilon + epsilon_rel * (norm of the terms of the residual)
+        """
+        return self.__epsilon_rel
+
+    @epsilon_rel.setter
+    def epsilon_rel(self, value):
+        if value < 0:
+            raise ValueError("epsilon_rel must be nonnegative")
+        self.__epsilon_rel = value
+
+    @property
+    def max_iters(self):
+        """
+        :return: max_iters: maximum number of iterations
+        """
+        return self.__max_iters
+
+    @max_iters.setter
+    def max_iters(self, value):
+        if value < 1:
+            raise ValueError("max_iters must be at least 1")
+        self.__max_iters = int(value)
+
+    @property
+    def time_budget(self):
+        """
+        :return: time_budget: wall-clock budget of a run in seconds, None for no budget
+        """
+        return self.__time_budget
+
+    @time_budget.setter
+    def time_budget(self, value):
+        if value is not None and value <= 0:
+            raise ValueError("time_budget must be positive")
+        self.__time_budget = value
+
+    @property
+    def check_every(self):
+        """
+        :return: check_every: the termination criteria are evaluated every check_every iterations
+        """
+        return self.__check_every
+
+    @check_every.setter
+    def check_every(self, value):
+        if value < 1:
+            raise ValueError("check_every must be at least 1")
+        self.__check_every = int(value)
+
     @property
     def P_seq(self):
         """
@@ -138,6 +282,7 @@ class Algorithms:
     @P_seq.setter
     def P_seq(self, value):
         self.__P_seq = value
+        self.__reset_workspaces()
 
     @property
     def R_tilde_seq(self):
@@ -149,6 +294,7 @@ class Algorithms:
     @R_tilde_seq.setter
     def R_tilde_seq(self, value):
         self.__R_tilde_seq = value
+        self.__reset_workspaces()
 
     @property
     def K_seq(self):
@@ -160,6 +306,7 @@ class Algorithms:
     @K_seq.setter
     def K_seq(self, value):
         self.__K_seq = value
+        self.__reset_workspaces()
 
     @property
     def A_bar_seq(self):
@@ -171,6 +318,43 @@ class Algorithms:
     @A_bar_seq.setter
     def A_bar_seq(self, value):
         self.__A_bar_seq = value
+        self.__reset_workspaces()
+
+    @property
+    def R_tilde_chol_seq(self):
+        """
+        :return: R_tilde_chol_seq: tensor, sequence of Cholesky factors of (R_tilde) from proximal of h offline part
+        """
+        return self.__R_tilde_chol_seq
+
+    @R_tilde_chol_seq.setter
+    def R_tilde_chol_seq(self, value):
+        self.__R_tilde_chol_seq = value
+        self.__reset_workspaces()
+
+    @property
+    def K_R_seq(self):
+        """
+        :return: K_R_seq: tensor, matrix sequence of (K^T (R + I/lambda)) from proximal of h offline part
+        """
+        return self.__K_R_seq
+
+    @K_R_seq.setter
+    def K_R_seq(self, value):
+        self.__K_R_seq = value
+        self.__reset_workspaces()
+
+    @property
+    def A_bar_P_B_seq(self):
+        """
+        :return: A_bar_P_B_seq: tensor, matrix sequence of (A_bar^T P B) from proximal of h offline part
+        """
+        return self.__A_bar_P_B_seq
+
+    @A_bar_P_B_seq.setter
+    def A_bar_P_B_seq(self, value):
+        self.__A_bar_P_B_seq = value
+        self.__reset_workspaces()
 
     @property
     def stage_constraints_state(self):
@@ -271,250 +455,331 @@ class Algorithms:
     @alpha.setter
     def alpha(self, value):
         self.__alpha = value
+        self.__reset_workspaces()
+
+    @property
+    def proximal_offline_cache(self):
+        """
+        :return: proximal_offline_cache: ProximalOfflineCache of this problem, needed by the algorithms that change
+        the proximal parameter during a solve (e.g., admm with adaptive_rho)
+        """
+        return self.__proximal_offline_cache
+
+    @proximal_offline_cache.setter
+    def proximal_offline_cache(self, value):
+        self.__proximal_offline_cache = value
+        self.__lambda_workspaces.clear()
 
     @property
     def z(self):
         return self.__z
 
+    @property
+    def eta(self):
+        return self.__eta
+
+    @property
+    def iterations(self):
+        """
+        :return: number of iterations of the last run
+        """
+        return self.__iterations
+
     @property
     def residuals_cache(self):
         return self.__residuals_cache
 
     @property
     def status(self):
+        """
+        :return: status: STATUS_CONVERGED (0), STATUS_MAX_ITERATIONS (1) or STATUS_TIME_BUDGET (2),
+        per column for chambolle_pock_batch
+        """
         return self.__status
 
-    def proj_to_c(self, vector):
+    @property
+    def status_message(self):
+        """
+        :return: status_message: why the last run stopped
+        """
+        if self.__status is None:
+            return None
+        if np.ndim(self.__status) > 0:
+            return [STATUS_MESSAGES[i] for i in self.__status]
+        return STATUS_MESSAGES[self.__status]
+
+    def __start_iterations(self, num_residuals):
+        """
+        Allocate the residuals cache, one row per evaluation of the termination criteria
+
+        :return: deadline of the time budget (time.perf_counter), or None
+        """
+        num_checks = -(-self.__max_iters // self.__check_every)
+        self.__residuals_cache = np.zeros((num_checks, num_residuals))
+        self.__num_checks = 0
+        self.__deadline = None if self.__time_budget is None else time.perf_counter() + self.__time_budget
+        return self.__deadline
+
+    def __is_check(self, i):
+        """Whether the termination criteria are evaluated at iteration i"""
+        return (i + 1) % self.__check_every == 0 or i == self.__max_iters - 1
+
+    def __record_residuals(self, *residuals):
+        self.__residuals_cache[self.__num_checks, :] = residuals
+        self.__num_checks += 1
+
+    def __converged(self, residuals, scales):
+        """
+        Absolute plus relative termination test, residual_j <= epsilon + epsilon_rel * scale_j for every j,
+        elementwise for per column residuals
+
+        :param residuals: norms of the residuals
+        :param scales: function returning the norms the residuals are relative to, only called if epsilon_rel > 0
+        """
+        epsilon = self.__epsilon
+        epsilon_rel = self.__epsilon_rel
+        converged = True
+        if epsilon_rel == 0:
+            for t in residuals:
+                converged = converged & (t <= epsilon)
+        else:
+            for t, scale in zip(residuals, scales()):
+                converged = converged & (t <= epsilon + epsilon_rel * scale)
+        return converged
+
+    def __finish_iterations(self, status, i):
+        self.__status = status
+        self.__iterations = i + 1
+        self.__residuals_cache = self.__residuals_cache[0:self.__num_checks, :]
+
+    def __reset_workspaces(self):
+        self.__workspace = None
+        self.__lambda_workspaces.clear()
+
+    def __proximal_workspace(self, proximal_lambda=None):
+        """
+        Online part of proximal of h with preallocated buffers, built once and reused by every iteration
+
+        :param proximal_lambda: parameter of the proximal operator, alpha if None; other values are factorized
+        through proximal_offline_cache and kept as long as the cache keeps their offline part
+        """
+        if proximal_lambda is not None and proximal_lambda != self.__alpha:
+            if self.__proximal_offline_cache is None:
+                raise ValueError("proximal_offline_cache is needed to change the proximal parameter")
+            key = float(proximal_lambda)
+            if key not in self.__lambda_workspaces or key not in self.__proximal_offline_cache:
+                offline = self.__proximal_offline_cache.get(key)
+                self.__lambda_workspaces[key] = core_online.ProximalOnlineWorkspace(
+                    self.__N, key, self.__A, self.__B, self.__R, offline.P_seq, offline.R_tilde_seq, offline.K_seq,
+                    offline.A_bar_seq, offline.R_tilde_chol_seq, offline.K_R_seq, offline.A_bar_P_B_seq)
+                while len(self.__lambda_workspaces) > self.__proximal_offline_cache.max_size:
+                    self.__lambda_workspaces.popitem(last=False)
+            else:
+                self.__proximal_offline_cache.get(key)  # keep the offline part recently used
+            self.__lambda_workspaces.move_to_end(key)
+            return self.__lambda_workspaces[key]
+        if self.__workspace is None:
+            self.__workspace = core_online.ProximalOnlineWorkspace(self.__N, self.__alpha, self.__A, self.__B, self.__R,
+                                                                   self.__P_seq, self.__R_tilde_seq, self.__K_seq,
+                                                                   self.__A_bar_seq, self.__R_tilde_chol_seq,
+                                                                   self.__K_R_seq, self.__A_bar_P_B_seq)
+        return self.__workspace
+
+    def proj_to_c(self, vector, out=None):
         """
         :param vector: the vector to be projected to sets (C_t) and C_N
+        :param out: optional array the projection is written into; it may be vector itself
         """
         n_c = self.__Gamma_x.shape[0]
         n_f = self.__Gamma_N.shape[0]
+        projection = np.empty(vector.shape) if out is None else out
         if type(self.__C_t).__name__ == 'Cartesian':
-            vector_list = [None] * self.__N
-            for i in range(self.__N):
-                vector_list[i] = vector[i * n_c: (i + 1) * n_c]
-            vector_stage = self.__C_t.project(vector_list)
+            self.__C_t.project_stacked(vector[0: self.__N * n_c], out=projection[0: self.__N * n_c])
         else:
-            vector_stage = self.__C_t.project(vector[0: self.__N * n_c])
-        vector_terminal = self.__C_N.project(vector[self.__N * n_c: self.__N * n_c + n_f])
-        vector = np.vstack((vector_stage, vector_terminal))
-        return vector
+            self.__C_t.project(vector[0: self.__N * n_c], out=projection[0: self.__N * n_c])
+        self.__C_N.project(vector[self.__N * n_c: self.__N * n_c + n_f],
+                           out=projection[self.__N * n_c: self.__N * n_c + n_f])
+        return projection
 
-    def anderson_acceleration(self, memory_num, x_k, T_x_k):
-        N = self.__N
-        x0 = self.__x0
-        A = self.__A
-        B = self.__B
-        R = self.__R
-        m = memory_num
-        i = self.__loop_time
-        n_x = A.shape[1]
-        n_u = B.shape[1]
-        n_z = N * (n_x + n_u) + n_x
-        alpha = self.__alpha
-        L = self.__L
-        L_adj = self.__L_adj
-        P_seq = self.__P_seq
-        R_tilde_seq = self.__R_tilde_seq
-        K_seq = self.__K_seq
-        A_bar_seq = self.__A_bar_seq
-        m_i = min(m, i)
-        oldest_flag = i % m
-        T_x_k_z_prev = T_x_k[0: n_z]
-        T_x_k_eta_prev = T_x_k[n_z: 2 * n_z]
-        T_x_k_z_next = core_online.proximal_of_h_online_part(prediction_horizon=N,
-                                                             proximal_lambda=alpha,
-                                                             initial_state=x0,
-                                                             initial_guess_vector=T_x_k_z_prev
-                                                                                  - alpha * L_adj @ T_x_k_eta_prev,
-                                                             state_dynamics=A,
-                                                             control_dynamics=B,
-                                                             control_weight=R,
-                                                             P_seq=P_seq,
-                                                             R_tilde_seq=R_tilde_seq,
-                                                             K_seq=K_seq,
-                                                             A_bar_seq=A_bar_seq)
-        T_x_k_eta_half_next = T_x_k_eta_prev + alpha * L @ (2 * T_x_k_z_next - T_x_k_z_prev)
-        T_x_k_eta_next = T_x_k_eta_half_next - alpha * Algorithms.proj_to_c(self, T_x_k_eta_half_next / alpha)
-        TT_x_k = np.vstack((T_x_k_z_next, T_x_k_eta_next))
-        self.__s_cache[oldest_flag] = x_k - T_x_k
-        self.__y_cache[oldest_flag] = (x_k - T_x_k) - (T_x_k - TT_x_k)
-        r_k = x_k - T_x_k
-        S_k = self.__s_cache[0]
-        Y_k = self.__y_cache[0]
-        for k in range(1, m_i + 1):
-            if k < m:
-                S_k = np.hstack((S_k, self.__s_cache[k]))
-                Y_k = np.hstack((Y_k, self.__y_cache[k]))
-        t_k = np.linalg.lstsq(Y_k, r_k, rcond=None)[0]
-        d_k = -r_k - (S_k - Y_k) @ t_k
-        return d_k
-
-    def sgn(self, x):
-        if x >= 0:
-            return 1
-        else:
-            return 0
+    def proj_to_c_columns(self, matrix, out=None):
+        """
+        :param matrix: (n_L, K) matrix whose columns are projected to sets (C_t) and C_N
+        :param out: optional (n_L, K) array the projection is written into; it may be matrix itself
+        """
+        n_c = self.__Gamma_x.shape[0]
+        n_f = self.__Gamma_N.shape[0]
+        projection = np.empty(matrix.shape) if out is None else out
+        _project_columns(self.__C_t, matrix[0: self.__N * n_c], projection[0: self.__N * n_c])
+        _project_columns(self.__C_N, matrix[self.__N * n_c: self.__N * n_c + n_f],
+                         projection[self.__N * n_c: self.__N * n_c + n_f])
+        return projection
 
-    def modified_restarted_broyden(self, memory_num, x_k, T_x_k):
-        N = self.__N
-        x0 = self.__x0
-        A = self.__A
-        B = self.__B
-        R = self.__R
-        m = memory_num
-        i = self.__loop_time
-        n_x = A.shape[1]
-        n_u = B.shape[1]
-        n_z = N * (n_x + n_u) + n_x
+    def anderson_acceleration(self, x_record):
+        """
+        :param x_record: _FixedPointRecord of x_k, evaluated
+        :return: Anderson direction d_k from the pairs (r(x), r(x) - r(T x)) of the last memory_num iterates
+        """
+        T_x = x_record.T_x
+        r_T_x = T_x - Algorithms.__cp_operator(self, T_x)
+        self.__anderson.add_difference(x_record.residual, x_record.residual - r_T_x)
+        return self.__anderson.direction(x_record.residual)
+
+    def modified_restarted_broyden(self, x_record):
+        """
+        :param x_record: _FixedPointRecord of x_k, evaluated
+        :return: Broyden direction d_k after the update with the differences of x_k and the previous iterate
+        """
+        self.__broyden.update(x_record.x, x_record.residual)
+        return self.__broyden.direction(x_record.residual)
+
+    def __supermann_inner(self, u, v, L_u_z=None):
+        """
+        Inner product <u, v>_A of the SuperMann metric A = [I, -alpha L_adj; -alpha L, I], matrix-free:
+        <u, v>_A = <u_z, v_z> + <u_eta, v_eta> - alpha (<L u_z, v_eta> + <u_eta, L v_z>)
+
+        :param u: stacked vector (z, eta)
+        :param v: stacked vector (z, eta)
+        :param L_u_z: L @ u_z if already computed
+        """
+        n_z = self.__z0.shape[0]
+        u_z = u[0: n_z]
+        u_eta = u[n_z:]
+        v_z = v[0: n_z]
+        v_eta = v[n_z:]
+        if L_u_z is None:
+            L_u_z = self.__L @ u_z
+        if v is u:
+            return np.vdot(u_z, u_z) + np.vdot(u_eta, u_eta) - 2 * self.__alpha * np.vdot(L_u_z, u_eta)
+        return np.vdot(u_z, v_z) + np.vdot(u_eta, v_eta) \
+            - self.__alpha * (np.vdot(L_u_z, v_eta) + np.vdot(u_eta, self.__L @ v_z))
+
+    def __supermann_norm(self, u, L_u_z=None):
+        """
+        :param u: stacked vector (z, eta)
+        :param L_u_z: L @ u_z if already computed
+        :return: ||u||_A, norm of the SuperMann metric
+        """
+        return sqrt(max(self.__supermann_inner(u, u, L_u_z), 0.))
+
+    def __cp_operator(self, x):
+        """
+        :param x: stacked vector (z, eta)
+        :return: T x, one Chambolle-Pock step from x
+        """
+        n_z = self.__z0.shape[0]
         alpha = self.__alpha
-        L = self.__L
-        L_adj = self.__L_adj
-        P_seq = self.__P_seq
-        R_tilde_seq = self.__R_tilde_seq
-        K_seq = self.__K_seq
-        A_bar_seq = self.__A_bar_seq
-        oldest_flag = i % m
-
-        theta_bar = 0.2
-        d = - (x_k - T_x_k)
-        w_k = x_k + d
-        w_k_z_prev = w_k[0: n_z]
-        w_k_eta_prev = w_k[n_z: 2 * n_z]
-        w_k_z_next = core_online.proximal_of_h_online_part(prediction_horizon=N,
-                                                           proximal_lambda=alpha,
-                                                           initial_state=x0,
-                                                           initial_guess_vector=w_k_z_prev
-                                                                                - alpha * L_adj @ w_k_eta_prev,
-                                                           state_dynamics=A,
-                                                           control_dynamics=B,
-                                                           control_weight=R,
-                                                           P_seq=P_seq,
-                                                           R_tilde_seq=R_tilde_seq,
-                                                           K_seq=K_seq,
-                                                           A_bar_seq=A_bar_seq)
-        w_k_eta_half_next = w_k_eta_prev + alpha * L @ (2 * w_k_z_next - w_k_z_prev)
-        w_k_eta_next = w_k_eta_half_next - alpha * Algorithms.proj_to_c(self, w_k_eta_half_next / alpha)
-        T_w_k = np.vstack((w_k_z_next, w_k_eta_next))
-
-        s = w_k - x_k
-        tilde_s = w_k - T_w_k - (x_k - T_x_k)
-        if oldest_flag == 0:
-            self.__s_cache = [s]
-            self.__y_cache = [tilde_s]
-            tilde_s = tilde_s + np.inner(self.__s_cache[0].T, tilde_s.T) * tilde_s
-            d = d + np.inner(self.__s_cache[0].T, d.T) * tilde_s
-        else:
-            self.__s_cache.append(s)
-            self.__y_cache.append(tilde_s)
-            num_s = len(self.__s_cache)
-            for k in range(num_s):
-                tilde_s = tilde_s + np.inner(self.__s_cache[num_s - k - 1].T, tilde_s.T) * self.__y_cache[num_s - k - 1]
-                d = d + np.inner(self.__s_cache[num_s - k - 1].T, d.T) * self.__y_cache[num_s - k - 1]
-        gamma = np.inner(tilde_s.T, s.T) / (np.linalg.norm(s) ** 2)
-        if abs(gamma) >= theta_bar:
-            theta = 1
-        else:
-            theta = (1 - Algorithms.sgn(self, gamma) * theta_bar) / (1 - gamma)
-        tilde_s = theta / (1 - theta + theta * gamma) / (np.linalg.norm(s) ** 2) * (s - tilde_s)
-        d = d + np.inner(s.T, d.T) * tilde_s
-        return d
+        z_prev = x[0: n_z]
+        eta_prev = x[n_z:]
+        z_next = self.__proximal_workspace().proximal(self.__x0, z_prev - alpha * self.__L_adj @ eta_prev)
+        eta_half_next = eta_prev + alpha * self.__L @ (2 * z_next - z_prev)
+        eta_next = eta_half_next - alpha * Algorithms.proj_to_c(self, eta_half_next / alpha)
+        return np.vstack((z_next, eta_next))
+
+    def __evaluate_record(self, record):
+        """Compute T x, the residual r = x - T x, L r_z and the norm of r of a _FixedPointRecord, once"""
+        if record.T_x is None:
+            record.T_x = Algorithms.__cp_operator(self, record.x)
+            record.residual = record.x - record.T_x
+            record.L_residual_z = self.__L @ record.residual[0: self.__z0.shape[0]]
+            record.norm = Algorithms.__supermann_norm(self, record.residual, record.L_residual_z)
+        return record
+
+    def SuperMann(self, x_record, memory_num, c0, c1, q, beta, sigma, lambda_, direction):
+        """
+        One SuperMann step from x_k
 
-    def SuperMann(self, z_prev, eta_prev, z_next, eta_next, op_A, memory_num, c0, c1, q, beta, sigma, lambda_,
-                  direction):
-        N = self.__N
-        x0 = self.__x0
-        A = self.__A
-        B = self.__B
-        R = self.__R
-        m = memory_num
+        :param x_record: _FixedPointRecord of x_k, evaluated
+        :return: _FixedPointRecord of x_{k+1}, evaluated if x_{k+1} was a line search candidate; the plain step
+        T x_k if the line search runs out of max_iters trials or of the time budget
+        """
         i = self.__loop_time
-        n_x = A.shape[1]
-        n_u = B.shape[1]
-        n_z = N * (n_x + n_u) + n_x
-        alpha = self.__alpha
-        L = self.__L
-        L_adj = self.__L_adj
-        P_seq = self.__P_seq
-        R_tilde_seq = self.__R_tilde_seq
-        K_seq = self.__K_seq
-        A_bar_seq = self.__A_bar_seq
-        n_max = 10000
-        x_k = np.vstack((z_prev, eta_prev))
-        T_x_k = np.vstack((z_next, eta_next))
+        x_k = x_record.x
+        r_x_k_norm = x_record.norm
         if i == 0:
-            self.__r_safe = sqrt((x_k - T_x_k).T @ op_A @ (x_k - T_x_k))
+            self.__r_safe = r_x_k_norm
             self.__supermann_eta = self.__r_safe
-        if sqrt((x_k - T_x_k).T @ op_A @ (x_k - T_x_k)) <= self.__epsilon:
-            return x_k
+        if r_x_k_norm <= self.__epsilon:
+            return x_record
 
         # Choose an update direction
         if direction is None:
             direction = 'anderson'
         if direction == 'anderson':
             # print('choose update direction using anderson acceleration')
-            d_k = Algorithms.anderson_acceleration(self, m, x_k, T_x_k)
+            d_k = Algorithms.anderson_acceleration(self, x_record)
         elif direction == 'broyden':
             # print('choose update direction using broyden method')
-            d_k = Algorithms.modified_restarted_broyden(self, m, x_k, T_x_k)
+            d_k = Algorithms.modified_restarted_broyden(self, x_record)
+        else:
+            raise ValueError("SuperMann direction '%s' not supported" % direction)
 
         # K0
-        if sqrt((x_k - T_x_k).T @ op_A @ (x_k - T_x_k)) <= c0 * self.__supermann_eta:
-            self.__supermann_eta = sqrt((x_k - T_x_k).T @ op_A @ (x_k - T_x_k))
-            w_k = x_k + d_k
-            x_k = w_k
-            return x_k
+        if r_x_k_norm <= c0 * self.__supermann_eta:
+            self.__supermann_eta = r_x_k_norm
+            return _FixedPointRecord(x_k + d_k)
         tau_k = 1
-        for k in range(n_max):
-            w_k = x_k + tau_k * d_k
-            w_z_prev = w_k[0:n_z]
-            w_eta_prev = w_k[n_z:2 * n_z]
-            w_z_next = core_online.proximal_of_h_online_part(prediction_horizon=N,
-                                                             proximal_lambda=alpha,
-                                                             initial_state=x0,
-                                                             initial_guess_vector=w_z_prev - alpha * L_adj @ w_eta_prev,
-                                                             state_dynamics=A,
-                                                             control_dynamics=B,
-                                                             control_weight=R,
-                                                             P_seq=P_seq,
-                                                             R_tilde_seq=R_tilde_seq,
-                                                             K_seq=K_seq,
-                                                             A_bar_seq=A_bar_seq)
-            w_eta_half_next = w_eta_prev + alpha * L @ (2 * w_z_next - w_z_prev)
-            w_eta_next = w_eta_half_next - alpha * Algorithms.proj_to_c(self, w_eta_half_next / alpha)
-            T_w_k = np.vstack((w_z_next, w_eta_next))
-            # K1
-            if sqrt((x_k - T_x_k).T @ op_A @ (x_k - T_x_k)) <= self.__r_safe \
-                    and sqrt((w_k - T_w_k).T @ op_A @ (w_k - T_w_k)) <= c1 * sqrt(
-                (x_k - T_x_k).T @ op_A @ (x_k - T_x_k)):
-                x_k = w_k
-                self.__r_safe = sqrt((w_k - T_w_k).T @ op_A @ (w_k - T_w_k)) + q ** i
+        for k in range(self.__max_iters):
+            if self.__deadline is not None and time.perf_counter() >= self.__deadline:
                 break
+            w_record = Algorithms.__evaluate_record(self, _FixedPointRecord(x_k + tau_k * d_k))
+            r_w_k = w_record.residual
+            r_w_k_norm = w_record.norm
+            # K1
+            if r_x_k_norm <= self.__r_safe and r_w_k_norm <= c1 * r_x_k_norm:
+                self.__r_safe = r_w_k_norm + q ** i
+                return w_record
             # K2
-            rho_k = sqrt((w_k - T_w_k).T @ op_A @ (w_k - T_w_k)) ** 2 - (w_k - T_w_k).T @ op_A @ (w_k - x_k)
-            if rho_k[0, 0] >= sigma * sqrt((w_k - T_w_k).T @ op_A @ (w_k - T_w_k)) \
-                    * sqrt((x_k - T_x_k).T @ op_A @ (x_k - T_x_k)):
-                x_k = x_k - lambda_ * rho_k[0, 0] / (sqrt((w_k - T_w_k).T @ op_A @ (w_k - T_w_k)) ** 2) * (
-                        w_k - T_w_k)
-                break
+            rho_k = r_w_k_norm ** 2 - Algorithms.__supermann_inner(self, r_w_k, w_record.x - x_k,
+                                                                   w_record.L_residual_z)
+            if rho_k >= sigma * r_w_k_norm * r_x_k_norm:
+                return _FixedPointRecord(x_k - lambda_ * rho_k / (r_w_k_norm ** 2) * r_w_k)
             else:
                 tau_k = beta * tau_k
-        return x_k
+        return _FixedPointRecord(x_record.T_x)
+
+    def __cp_scales(self, z, eta, L_z, L_adj_eta, axis=None, tau=None, sigma=None):
+        """
+        Norms of the terms of the Chambolle-Pock residuals xi_1 (z / tau and L_adj eta), xi_2 (eta / sigma and
+        L z) and xi_gap (all of them), the scales of their relative tolerances
 
-    def chambolle_pock(self):
+        :param axis: None for vectors, 0 for per column scales
+        :param tau: primal step size, alpha if None
+        :param sigma: dual step size, alpha if None
+        """
+        tau = self.__alpha if tau is None else tau
+        sigma = self.__alpha if sigma is None else sigma
+        scale_1 = np.maximum(_norm_inf(z, axis) / tau, _norm_inf(L_adj_eta, axis))
+        scale_2 = np.maximum(_norm_inf(eta, axis) / sigma, _norm_inf(L_z, axis))
+        return scale_1, scale_2, np.maximum(scale_1, scale_2)
+
+    def __admm_scales(self, z, L_adj_eta, u, rho):
+        """
+        Scales of the relative tolerances of the ADMM residuals: the dual residual s relative to the norm of the
+        (unscaled) dual variable rho u, the primal residual r = z - L_adj eta relative to the larger of the norms of
+        z and L_adj eta
+        """
+        return rho * _norm_2(u), max(_norm_2(z), _norm_2(L_adj_eta))
+
+    def chambolle_pock(self, relaxation=1., adaptive_step=False, step_tau=2.):
+        """
+        Chambolle-Pock method, with the Krasnosel'skii-Mann relaxation x <- x + relaxation (T x - x) of x = (z, eta),
+        and with primal and dual step sizes tau = sigma = alpha, or adaptive steps with tau * sigma = alpha^2
+
+        :param relaxation: relaxation parameter in (0, 2), 1 for the plain iteration
+        :param adaptive_step: whether to balance the primal and dual steps during the solve, the ratio tau / sigma
+        follows (||z_prev - z_next|| / ||eta_prev - eta_next||)^2 at every check
+        :param step_tau: factor of every change of tau (and 1 / step_tau of sigma), so tau stays on the grid
+        alpha * step_tau^k and the Riccati factorizations of proximal_offline_cache are reused
+        """
+        if not 0 < relaxation < 2:
+            raise ValueError("relaxation must be in (0, 2)")
         N = self.__N
         A = self.__A
         B = self.__B
-        R = self.__R
         L = self.__L
         L_adj = self.__L_adj
-        P_seq = self.__P_seq
-        R_tilde_seq = self.__R_tilde_seq
-        K_seq = self.__K_seq
-        A_bar_seq = self.__A_bar_seq
+        workspace = self.__proximal_workspace()
         alpha = self.__alpha
-        epsilon = self.__epsilon
         n_x = A.shape[1]
         n_u = B.shape[1]
         n_z = N * (n_x + n_u) + n_x
@@ -527,62 +792,314 @@ class Algorithms:
         if eta0.shape[0] != n_L:
             raise ValueError("Initial guess vector eta row is not correct")
 
-        z_next = z0
-        eta_next = eta0
-        n_max = 10000
-        self.__residuals_cache = np.zeros((n_max, 3))
-
-        for i in range(n_max):
+        # fixed buffers, swapped between iterations
+        z_next = np.array(z0, dtype=float)
+        z_prev = np.empty(z_next.shape)
+        eta_next = np.array(eta0, dtype=float)
+        eta_prev = np.empty(eta_next.shape)
+        eta_half_next = np.empty(eta_next.shape)
+        eta_tmp = np.empty(eta_next.shape)
+        z_tmp = np.empty(z_next.shape)
+        xi_1 = np.empty(z_next.shape)
+        xi_2 = np.empty(eta_next.shape)
+        xi_gap = np.empty(z_next.shape)
+        # L z and L_adj eta of the last two iterates; by linearity the step and the residuals only need
+        # L z_next and L_adj eta_next, so L and L_adj are applied once per iteration (plus once per check)
+        L_z_next = np.array(L @ z_next, dtype=float)
+        L_z_prev = np.empty(L_z_next.shape)
+        L_adj_eta_next = np.array(L_adj @ eta_next, dtype=float)
+        L_adj_eta_prev = np.empty(L_adj_eta_next.shape)
+        tau = sigma = alpha
+        step_exponent = 0  # tau = alpha * step_tau^step_exponent, sigma = alpha / step_tau^step_exponent
+        num_step_updates = 0
+        deadline = self.__start_iterations(3)
+        status = STATUS_MAX_ITERATIONS
+
+        for i in range(self.__max_iters):
             self.__loop_time = i
-            z_prev = z_next
-            eta_prev = eta_next
-            z_next = core_online.proximal_of_h_online_part(prediction_horizon=N,
-                                                           proximal_lambda=alpha,
-                                                           initial_state=x0,
-                                                           initial_guess_vector=z_prev - alpha * L_adj @ eta_prev,
-                                                           state_dynamics=A,
-                                                           control_dynamics=B,
-                                                           control_weight=R,
-                                                           P_seq=P_seq,
-                                                           R_tilde_seq=R_tilde_seq,
-                                                           K_seq=K_seq,
-                                                           A_bar_seq=A_bar_seq)
-            eta_half_next = eta_prev + alpha * L @ (2 * z_next - z_prev)
-            eta_next = eta_half_next - alpha * Algorithms.proj_to_c(self, eta_half_next / alpha)
+            z_prev, z_next = z_next, z_prev
+            eta_prev, eta_next = eta_next, eta_prev
+            L_z_prev, L_z_next = L_z_next, L_z_prev
+            L_adj_eta_prev, L_adj_eta_next = L_adj_eta_next, L_adj_eta_prev
+            np.multiply(tau, L_adj_eta_prev, out=z_tmp)
+            np.subtract(z_prev, z_tmp, out=z_tmp)
+            workspace.proximal(x0, z_tmp, out=z_next)
+            np.copyto(L_z_next, L @ z_next)
+            np.multiply(2, L_z_next, out=eta_half_next)
+            eta_half_next -= L_z_prev
+            eta_half_next *= sigma
+            np.add(eta_prev, eta_half_next, out=eta_half_next)
+            np.divide(eta_half_next, sigma, out=eta_tmp)
+            Algorithms.proj_to_c(self, eta_tmp, out=eta_tmp)
+            eta_tmp *= sigma
+            np.subtract(eta_half_next, eta_tmp, out=eta_next)
+            np.copyto(L_adj_eta_next, L_adj @ eta_next)
 
             # Termination criteria
-            xi_1 = (z_prev - z_next) / alpha - L_adj @ (eta_prev - eta_next)
-            xi_2 = (eta_prev - eta_next) / alpha + L @ (z_next - z_prev)
-            xi_gap = xi_1 + L_adj @ xi_2
-            t_1 = np.linalg.norm(xi_1, np.inf)
-            t_2 = np.linalg.norm(xi_2, np.inf)
-            t_3 = np.linalg.norm(xi_gap, np.inf)
-            self.__residuals_cache[i, 0] = t_1
-            self.__residuals_cache[i, 1] = t_2
-            self.__residuals_cache[i, 2] = t_3
-
-            if t_1 <= epsilon and t_2 <= epsilon and t_3 <= epsilon:
+            if self.__is_check(i):
+                np.subtract(z_prev, z_next, out=z_tmp)
+                np.subtract(eta_prev, eta_next, out=xi_2)
+                if adaptive_step:
+                    delta_z = _norm_2(z_tmp)
+                    delta_eta = _norm_2(xi_2)
+                z_tmp /= tau
+                np.subtract(L_adj_eta_prev, L_adj_eta_next, out=xi_1)
+                np.subtract(z_tmp, xi_1, out=xi_1)
+                xi_2 /= sigma
+                np.subtract(L_z_next, L_z_prev, out=eta_tmp)
+                xi_2 += eta_tmp
+                np.add(xi_1, L_adj @ xi_2, out=xi_gap)
+                t_1 = _norm_inf(xi_1)
+                t_2 = _norm_inf(xi_2)
+                t_3 = _norm_inf(xi_gap)
+                self.__record_residuals(t_1, t_2, t_3)
+                if self.__converged((t_1, t_2, t_3), lambda: Algorithms.__cp_scales(
+                        self, z_next, eta_next, L_z_next, L_adj_eta_next, tau=tau, sigma=sigma)):
+                    status = STATUS_CONVERGED
+                    break
+                if adaptive_step and num_step_updates < CP_MAX_STEP_UPDATES and delta_z > 0:
+                    # balancing: tau = alpha * step_tau^k moves one grid point towards alpha * delta_z / delta_eta
+                    step_change = 0
+                    if delta_eta == 0 or delta_z > delta_eta * step_tau ** (step_exponent + 0.5):
+                        step_change = 1 if step_exponent < CP_MAX_STEP_EXPONENT else 0
+                    elif delta_z < delta_eta * step_tau ** (step_exponent - 0.5):
+                        step_change = -1 if step_exponent > -CP_MAX_STEP_EXPONENT else 0
+                    if step_change != 0:
+                        step_exponent += step_change
+                        num_step_updates += 1
+                        tau = alpha * step_tau ** step_exponent
+                        sigma = alpha * alpha / tau
+                        workspace = self.__proximal_workspace(alpha if step_exponent == 0 else tau)
+            if relaxation != 1:
+                # x_next = x_prev + relaxation (T x_prev - x_prev) in place, also for L z and L_adj eta by linearity
+                for x_prev, x_next in ((z_prev, z_next), (eta_prev, eta_next), (L_z_prev, L_z_next),
+                                       (L_adj_eta_prev, L_adj_eta_next)):
+                    x_next -= x_prev
+                    x_next *= relaxation
+                    x_next += x_prev
+            if deadline is not None and time.perf_counter() >= deadline:
+                status = STATUS_TIME_BUDGET
                 break
-        self.__status = 0  # converge success
-        if self.__loop_time >= 9000:
-            self.__status = 1  # converge failed
-        self.__residuals_cache = self.__residuals_cache[0:self.__loop_time, :]
+        self.__finish_iterations(status, i)
         self.__z = z_next
+        self.__eta = eta_next
+        return self
+
+    def chambolle_pock_accelerated(self, restart="residual", momentum_max=0.3):
+        """
+        Inertial Chambolle-Pock method with adaptive restart: x_{k+1} = T w_k from the extrapolated point
+        w_k = x_k + min(j / (j + 3), momentum_max) (x_k - x_{k-1}) of x = (z, eta), j the number of iterations since
+        the last restart
+
+        The momentum is restarted (j = 0) at a check where
+        'residual': the largest residual in residuals_cache increased since the previous check,
+        'gradient': the step x_{k+1} - x_k makes a positive inner product with the residuals (xi_1, xi_2) at
+        x_{k+1}, i.e., it goes uphill
+
+        T is firmly nonexpansive in the metric of the Chambolle-Pock method, so with momentum_max < 1/3 the iterates
+        converge by the results on inertial Krasnosel'skii-Mann iterations with nondecreasing inertial weights
+        bounded below 1/3 (Alvarez and Attouch; Lorenz and Pock). The weights are nondecreasing between restarts,
+        and there are at most CP_MAX_RESTARTS restarts, so the guarantee holds for the tail of the iterations.
+        Larger momentum_max is faster on some problems but its convergence only rests on the restarts.
+
+        :param restart: restart scheme, 'residual' or 'gradient'
+        :param momentum_max: bound of the inertial weight, in [0, 1)
+        """
+        if restart not in CP_RESTARTS:
+            raise ValueError("restart scheme '%s' not supported" % restart)
+        if not 0 <= momentum_max < 1:
+            raise ValueError("momentum_max must be in [0, 1)")
+        N = self.__N
+        A = self.__A
+        B = self.__B
+        L = self.__L
+        L_adj = self.__L_adj
+        workspace = self.__proximal_workspace()
+        alpha = self.__alpha
+        n_x = A.shape[1]
+        n_u = B.shape[1]
+        n_z = N * (n_x + n_u) + n_x
+        n_L = self.__L_z.shape[0]
+        x0 = self.__x0.copy()
+        z0 = self.__z0.copy()
+        eta0 = self.__eta0.copy()
+        if z0.shape[0] != n_z:
+            raise ValueError("Initial guess vector z row is not correct")
+        if eta0.shape[0] != n_L:
+            raise ValueError("Initial guess vector eta row is not correct")
+
+        # fixed buffers of x_{k-1}, x_k and x_{k+1}, rotated between iterations, and of w_k
+        z_curr = np.array(z0, dtype=float)
+        z_next = np.array(z0, dtype=float)
+        z_prev = np.empty(z_curr.shape)
+        z_w = np.empty(z_curr.shape)
+        eta_curr = np.array(eta0, dtype=float)
+        eta_next = np.array(eta0, dtype=float)
+        eta_prev = np.empty(eta_curr.shape)
+        eta_w = np.empty(eta_curr.shape)
+        eta_half_next = np.empty(eta_curr.shape)
+        eta_tmp = np.empty(eta_curr.shape)
+        z_tmp = np.empty(z_curr.shape)
+        xi_1 = np.empty(z_curr.shape)
+        xi_2 = np.empty(eta_curr.shape)
+        xi_gap = np.empty(z_curr.shape)
+        # L z and L_adj eta of the same points, extrapolated by linearity like z and eta
+        L_z_curr = np.array(L @ z_curr, dtype=float)
+        L_z_next = L_z_curr.copy()
+        L_z_prev = np.empty(L_z_curr.shape)
+        L_z_w = np.empty(L_z_curr.shape)
+        L_adj_eta_curr = np.array(L_adj @ eta_curr, dtype=float)
+        L_adj_eta_next = L_adj_eta_curr.copy()
+        L_adj_eta_prev = np.empty(L_adj_eta_curr.shape)
+        L_adj_eta_w = np.empty(L_adj_eta_curr.shape)
+        j = 0  # iterations since the last restart
+        num_restarts = 0
+        deadline = self.__start_iterations(3)
+        status = STATUS_MAX_ITERATIONS
+
+        for i in range(self.__max_iters):
+            self.__loop_time = i
+            z_prev, z_curr, z_next = z_curr, z_next, z_prev
+            eta_prev, eta_curr, eta_next = eta_curr, eta_next, eta_prev
+            L_z_prev, L_z_curr, L_z_next = L_z_curr, L_z_next, L_z_prev
+            L_adj_eta_prev, L_adj_eta_curr, L_adj_eta_next = L_adj_eta_curr, L_adj_eta_next, L_adj_eta_prev
+            momentum = min(j / (j + 3), momentum_max)
+            for x_prev, x_curr, x_w in ((z_prev, z_curr, z_w), (eta_prev, eta_curr, eta_w),
+                                        (L_z_prev, L_z_curr, L_z_w), (L_adj_eta_prev, L_adj_eta_curr, L_adj_eta_w)):
+                np.subtract(x_curr, x_prev, out=x_w)
+                x_w *= momentum
+                x_w += x_curr
+            np.multiply(alpha, L_adj_eta_w, out=z_tmp)
+            np.subtract(z_w, z_tmp, out=z_tmp)
+            workspace.proximal(x0, z_tmp, out=z_next)
+            np.copyto(L_z_next, L @ z_next)
+            np.multiply(2, L_z_next, out=eta_half_next)
+            eta_half_next -= L_z_w
+            eta_half_next *= alpha
+            np.add(eta_w, eta_half_next, out=eta_half_next)
+            np.divide(eta_half_next, alpha, out=eta_tmp)
+            Algorithms.proj_to_c(self, eta_tmp, out=eta_tmp)
+            eta_tmp *= alpha
+            np.subtract(eta_half_next, eta_tmp, out=eta_next)
+            np.copyto(L_adj_eta_next, L_adj @ eta_next)
+            j += 1
+
+            # Termination criteria, the residuals of the Chambolle-Pock step from w_k
+            if self.__is_check(i):
+                np.subtract(z_w, z_next, out=z_tmp)
+                z_tmp /= alpha
+                np.subtract(L_adj_eta_w, L_adj_eta_next, out=xi_1)
+                np.subtract(z_tmp, xi_1, out=xi_1)
+                np.subtract(eta_w, eta_next, out=xi_2)
+                xi_2 /= alpha
+                np.subtract(L_z_next, L_z_w, out=eta_tmp)
+                xi_2 += eta_tmp
+                np.add(xi_1, L_adj @ xi_2, out=xi_gap)
+                t_1 = _norm_inf(xi_1)
+                t_2 = _norm_inf(xi_2)
+                t_3 = _norm_inf(xi_gap)
+                self.__record_residuals(t_1, t_2, t_3)
+                if self.__converged((t_1, t_2, t_3), lambda: Algorithms.__cp_scales(
+                        self, z_next, eta_next, L_z_next, L_adj_eta_next)):
+                    status = STATUS_CONVERGED
+                    break
+                if num_restarts == CP_MAX_RESTARTS:
+                    restart_now = False
+                elif restart == "residual":
+                    k = self.__num_checks - 1
+                    restart_now = k > 0 and \
+                        self.__residuals_cache[k, :].max() > self.__residuals_cache[k - 1, :].max()
+                else:
+                    np.subtract(z_next, z_curr, out=z_tmp)
+                    np.subtract(eta_next, eta_curr, out=eta_tmp)
+                    restart_now = np.vdot(xi_1, z_tmp) + np.vdot(xi_2, eta_tmp) > 0
+                if restart_now:
+                    j = 0
+                    num_restarts += 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                status = STATUS_TIME_BUDGET
+                break
+        self.__finish_iterations(status, i)
+        self.__z = z_next
+        self.__eta = eta_next
+        return self
+
+    def chambolle_pock_batch(self):
+        """
+        Chambolle-Pock method for K initial states at once
+
+        initial_state is (n_x, K), the initial guesses are (n_z, K) and (n_L, K) or single columns used for all
+        problems. Every column stops updating once it meets the termination criteria; z, eta, status and iterations
+        are then per column and residuals_cache holds the largest residuals over the running columns.
+        """
+        N = self.__N
+        A = self.__A
+        B = self.__B
+        L = self.__L
+        L_adj = self.__L_adj
+        workspace = self.__proximal_workspace()
+        alpha = self.__alpha
+        n_x = A.shape[1]
+        n_u = B.shape[1]
+        n_z = N * (n_x + n_u) + n_x
+        n_L = self.__L_z.shape[0]
+        x0 = np.reshape(self.__x0, (n_x, -1))
+        K = x0.shape[1]
+        if self.__z0.shape[0] != n_z:
+            raise ValueError("Initial guess vector z row is not correct")
+        if self.__eta0.shape[0] != n_L:
+            raise ValueError("Initial guess vector eta row is not correct")
+        z = np.array(np.broadcast_to(np.reshape(self.__z0, (n_z, -1)), (n_z, K)))
+        eta = np.array(np.broadcast_to(np.reshape(self.__eta0, (n_L, -1)), (n_L, K)))
+
+        deadline = self.__start_iterations(3)
+        status = np.full(K, STATUS_MAX_ITERATIONS)
+        iterations = np.zeros(K, dtype=int)
+        running = np.arange(K)
+
+        for i in range(self.__max_iters):
+            self.__loop_time = i
+            z_prev = z[:, running]
+            eta_prev = eta[:, running]
+            z_next = workspace.proximal(x0[:, running], z_prev - alpha * (L_adj @ eta_prev))
+            eta_half_next = eta_prev + alpha * (L @ (2 * z_next - z_prev))
+            eta_next = eta_half_next - alpha * Algorithms.proj_to_c_columns(self, eta_half_next / alpha)
+            z[:, running] = z_next
+            eta[:, running] = eta_next
+            iterations[running] += 1
+
+            # Termination criteria, per column
+            if self.__is_check(i):
+                xi_1 = (z_prev - z_next) / alpha - L_adj @ (eta_prev - eta_next)
+                xi_2 = (eta_prev - eta_next) / alpha + L @ (z_next - z_prev)
+                xi_gap = xi_1 + L_adj @ xi_2
+                t_1 = _norm_inf(xi_1, axis=0)
+                t_2 = _norm_inf(xi_2, axis=0)
+                t_3 = _norm_inf(xi_gap, axis=0)
+                self.__record_residuals(np.max(t_1), np.max(t_2), np.max(t_3))
+                converged = self.__converged((t_1, t_2, t_3), lambda: Algorithms.__cp_scales(
+                    self, z_next, eta_next, L @ z_next, L_adj @ eta_next, axis=0))
+                status[running[converged]] = STATUS_CONVERGED
+                running = running[~converged]
+                if running.size == 0:
+                    break
+            if deadline is not None and time.perf_counter() >= deadline:
+                status[running] = STATUS_TIME_BUDGET
+                break
+        self.__finish_iterations(status, i)
+        self.__z = z
+        self.__eta = eta
+        self.__iterations = iterations
         return self
 
     def chambolle_pock_scaling(self, scaling_factor):
         N = self.__N
         A = self.__A
         B = self.__B
-        R = self.__R
         L = self.__L
-        P_seq = self.__P_seq
-        R_tilde_seq = self.__R_tilde_seq
-        K_seq = self.__K_seq
-        A_bar_seq = self.__A_bar_seq
+        workspace = self.__proximal_workspace()
         L_adj = self.__L_adj
         alpha = self.__alpha
-        epsilon = self.__epsilon
         n_x = A.shape[1]
         n_u = B.shape[1]
         n_z = N * (n_x + n_u) + n_x
@@ -600,73 +1117,83 @@ class Algorithms:
         if eta0.shape[0] != n_L:
             raise ValueError("Initial guess vector eta row is not correct")
 
-        z_next = z0
-        eta_next = eta0
-        n_max = 10000
-        self.__residuals_cache = np.zeros((n_max, 3))
-
-        for i in range(n_max):
-            z_prev = z_next
-            eta_prev = eta_next
-            z_next = core_online.proximal_of_h_online_part(prediction_horizon=N,
-                                                           proximal_lambda=alpha,
-                                                           initial_state=x0,
-                                                           initial_guess_vector=z_prev - alpha * L_adj @ eta_prev,
-                                                           state_dynamics=A,
-                                                           control_dynamics=B,
-                                                           control_weight=R,
-                                                           P_seq=P_seq,
-                                                           R_tilde_seq=R_tilde_seq,
-                                                           K_seq=K_seq,
-                                                           A_bar_seq=A_bar_seq)
-            eta_half_next = eta_prev + alpha * L @ (2 * z_next - z_prev)
-            eta_next = eta_half_next - alpha * Algorithms.proj_to_c(self, eta_half_next / alpha)
+        # fixed buffers, swapped between iterations
+        z_next = np.array(z0, dtype=float)
+        z_prev = np.empty(z_next.shape)
+        eta_next = np.array(eta0, dtype=float)
+        eta_prev = np.empty(eta_next.shape)
+        eta_half_next = np.empty(eta_next.shape)
+        eta_tmp = np.empty(eta_next.shape)
+        z_tmp = np.empty(z_next.shape)
+        z_prev_scaling_back = np.empty(z_next.shape)
+        z_next_scaling_back = np.empty(z_next.shape)
+        eta_prev_scaling_back = np.empty(eta_next.shape)
+        eta_next_scaling_back = np.empty(eta_next.shape)
+        xi_1 = np.empty(z_next.shape)
+        xi_2 = np.empty(eta_next.shape)
+        xi_gap = np.empty(z_next.shape)
+        deadline = self.__start_iterations(3)
+        status = STATUS_MAX_ITERATIONS
+
+        for i in range(self.__max_iters):
+            z_prev, z_next = z_next, z_prev
+            eta_prev, eta_next = eta_next, eta_prev
+            np.multiply(alpha, L_adj @ eta_prev, out=z_tmp)
+            np.subtract(z_prev, z_tmp, out=z_tmp)
+            workspace.proximal(x0, z_tmp, out=z_next)
+            np.multiply(2, z_next, out=z_tmp)
+            z_tmp -= z_prev
+            np.multiply(alpha, L @ z_tmp, out=eta_half_next)
+            np.add(eta_prev, eta_half_next, out=eta_half_next)
+            np.divide(eta_half_next, alpha, out=eta_tmp)
+            Algorithms.proj_to_c(self, eta_tmp, out=eta_tmp)
+            eta_tmp *= alpha
+            np.subtract(eta_half_next, eta_tmp, out=eta_next)
 
             # Termination criteria
-            # scaling back
-            z_prev_scaling_back = z_prev * scaling_factor
-            eta_prev_scaling_back = eta_prev * scaling_factor
-            z_next_scaling_back = z_next * scaling_factor
-            eta_next_scaling_back = eta_next * scaling_factor
-
-            xi_1 = (z_prev_scaling_back - z_next_scaling_back) / alpha \
-                   - L_adj @ (eta_prev_scaling_back - eta_next_scaling_back)
-            xi_2 = (eta_prev_scaling_back - eta_next_scaling_back) / alpha \
-                   + L @ (z_next_scaling_back - z_prev_scaling_back)
-            xi_gap = xi_1 + L_adj @ xi_2
-            t_1 = np.linalg.norm(xi_1, np.inf)
-            t_2 = np.linalg.norm(xi_2, np.inf)
-            t_3 = np.linalg.norm(xi_gap, np.inf)
-            self.__residuals_cache[i, 0] = t_1
-            self.__residuals_cache[i, 1] = t_2
-            self.__residuals_cache[i, 2] = t_3
-            if t_1 <= epsilon and t_2 <= epsilon and t_3 <= epsilon:
+            if self.__is_check(i):
+                # scaling back
+                np.multiply(z_prev, scaling_factor, out=z_prev_scaling_back)
+                np.multiply(eta_prev, scaling_factor, out=eta_prev_scaling_back)
+                np.multiply(z_next, scaling_factor, out=z_next_scaling_back)
+                np.multiply(eta_next, scaling_factor, out=eta_next_scaling_back)
+
+                np.subtract(z_prev_scaling_back, z_next_scaling_back, out=z_tmp)
+                z_tmp /= alpha
+                np.subtract(eta_prev_scaling_back, eta_next_scaling_back, out=eta_tmp)
+                np.subtract(z_tmp, L_adj @ eta_tmp, out=xi_1)
+                np.divide(eta_tmp, alpha, out=xi_2)
+                np.subtract(z_next_scaling_back, z_prev_scaling_back, out=z_tmp)
+                xi_2 += L @ z_tmp
+                np.add(xi_1, L_adj @ xi_2, out=xi_gap)
+                t_1 = _norm_inf(xi_1)
+                t_2 = _norm_inf(xi_2)
+                t_3 = _norm_inf(xi_gap)
+                self.__record_residuals(t_1, t_2, t_3)
+                if self.__converged((t_1, t_2, t_3), lambda: Algorithms.__cp_scales(
+                        self, z_next_scaling_back, eta_next_scaling_back, L @ z_next_scaling_back,
+                        L_adj @ eta_next_scaling_back)):
+                    status = STATUS_CONVERGED
+                    break
+            if deadline is not None and time.perf_counter() >= deadline:
+                status = STATUS_TIME_BUDGET
                 break
-        self.__status = 0  # converge success
-        if i >= 9000:
-            self.__status = 1  # converge failed
-        self.__residuals_cache = self.__residuals_cache[0:i, :]
-        self.__z = z_next_scaling_back
+        self.__finish_iterations(status, i)
+        self.__z = np.multiply(z_next, scaling_factor, out=z_next_scaling_back)
+        self.__eta = np.multiply(eta_next, scaling_factor, out=eta_next_scaling_back)
         return self
 
     def chambolle_pock_supermann(self, memory_num, c0, c1, q, beta, sigma, lambda_, direction):
         N = self.__N
         A = self.__A
         B = self.__B
-        R = self.__R
         L = self.__L
         L_adj = self.__L_adj
-        P_seq = self.__P_seq
-        R_tilde_seq = self.__R_tilde_seq
-        K_seq = self.__K_seq
-        A_bar_seq = self.__A_bar_seq
         alpha = self.__alpha
-        epsilon = self.__epsilon
         n_x = A.shape[1]
         n_u = B.shape[1]
         n_z = N * (n_x + n_u) + n_x
         n_L = self.__L_z.shape[0]
-        x0 = self.__x0.copy()
         z0 = self.__z0.copy()
         eta0 = self.__eta0.copy()
         if z0.shape[0] != n_z:
@@ -674,75 +1201,68 @@ class Algorithms:
         if eta0.shape[0] != n_L:
             raise ValueError("Initial guess vector eta row is not correct")
 
-        z_next = z0
-        eta_next = eta0
-        n_max = 10000
-        self.__residuals_cache = np.zeros((n_max, 3))
+        deadline = self.__start_iterations(3)
+        status = STATUS_MAX_ITERATIONS
 
         # SuperMann parameter
         m = memory_num
-        self.__s_cache = [None] * m
-        self.__y_cache = [None] * m
-
-        op_A = np.hstack((np.eye(n_z), -alpha * L_adj @ np.identity(n_z)))
-        op_A = np.vstack((op_A, np.hstack((-alpha * L @ np.identity(n_z), np.eye(n_z)))))
+        self.__anderson = core_anderson.AndersonAcceleration(n_z + n_L, m)
+        self.__broyden = core_broyden.RestartedBroyden(n_z + n_L, m)
 
-        for i in range(n_max):
+        # x_k with T x_k and its residual norm; a line search candidate accepted by SuperMann is already evaluated
+        x_record = _FixedPointRecord(np.vstack((z0, eta0)))
+        for i in range(self.__max_iters):
             self.__loop_time = i
-            z_prev = z_next
-            eta_prev = eta_next
-            z_next = core_online.proximal_of_h_online_part(prediction_horizon=N,
-                                                           proximal_lambda=alpha,
-                                                           initial_state=x0,
-                                                           initial_guess_vector=z_prev - alpha * L_adj @ eta_prev,
-                                                           state_dynamics=A,
-                                                           control_dynamics=B,
-                                                           control_weight=R,
-                                                           P_seq=P_seq,
-                                                           R_tilde_seq=R_tilde_seq,
-                                                           K_seq=K_seq,
-                                                           A_bar_seq=A_bar_seq)
-            eta_half_next = eta_prev + alpha * L @ (2 * z_next - z_prev)
-            eta_next = eta_half_next - alpha * Algorithms.proj_to_c(self, eta_half_next / alpha)
+            Algorithms.__evaluate_record(self, x_record)
+            z_prev = x_record.x[0:n_z]
+            eta_prev = x_record.x[n_z:]
 
             # use SuperMann
-            x_k = Algorithms.SuperMann(
-                self, z_prev, eta_prev, z_next, eta_next, op_A, m, c0, c1, q, beta, sigma, lambda_, direction)
+            x_record = Algorithms.SuperMann(self, x_record, m, c0, c1, q, beta, sigma, lambda_, direction)
             # update z, eta to CP
-            z_next = x_k[0:n_z]
-            eta_next = x_k[n_z:2 * n_z]
+            z_next = x_record.x[0:n_z]
+            eta_next = x_record.x[n_z:]
 
             # Termination criteria
-            xi_1 = (z_prev - z_next) / alpha - L_adj @ (eta_prev - eta_next)
-            xi_2 = (eta_prev - eta_next) / alpha + L @ (z_next - z_prev)
-            xi_gap = xi_1 + L_adj @ xi_2
-            t_1 = np.linalg.norm(xi_1, np.inf)
-            t_2 = np.linalg.norm(xi_2, np.inf)
-            t_3 = np.linalg.norm(xi_gap, np.inf)
-            self.__residuals_cache[i, 0] = t_1
-            self.__residuals_cache[i, 1] = t_2
-            self.__residuals_cache[i, 2] = t_3
-            if t_1 <= epsilon and t_2 <= epsilon and t_3 <= epsilon:
+            if self.__is_check(i):
+                xi_1 = (z_prev - z_next) / alpha - L_adj @ (eta_prev - eta_next)
+                xi_2 = (eta_prev - eta_next) / alpha + L @ (z_next - z_prev)
+                xi_gap = xi_1 + L_adj @ xi_2
+                t_1 = _norm_inf(xi_1)
+                t_2 = _norm_inf(xi_2)
+                t_3 = _norm_inf(xi_gap)
+                self.__record_residuals(t_1, t_2, t_3)
+                if self.__converged((t_1, t_2, t_3), lambda: Algorithms.__cp_scales(
+                        self, z_next, eta_next, L @ z_next, L_adj @ eta_next)):
+                    status = STATUS_CONVERGED
+                    break
+            if deadline is not None and time.perf_counter() >= deadline:
+                status = STATUS_TIME_BUDGET
                 break
-        self.__status = 0  # converge success
-        if self.__loop_time >= 9000:
-            self.__status = 1  # converge failed
-        self.__residuals_cache = self.__residuals_cache[0:self.__loop_time, :]
+        self.__finish_iterations(status, i)
         self.__z = z_next
+        self.__eta = eta_next
         return self
 
-    def admm(self):
+    def admm(self, adaptive_rho=False, rho_mu=10., rho_tau=2., relaxation=1.):
+        """
+        ADMM with penalty rho = 1 / alpha, or adaptive rho by residual balancing
+
+        :param adaptive_rho: whether to balance the residuals by changing rho during the solve
+        :param rho_mu: rho is changed when one residual is rho_mu times larger than the other
+        :param rho_tau: factor of every change of rho, so rho stays on the grid (1 / alpha) * rho_tau^k and the
+        Riccati factorizations of proximal_offline_cache are reused
+        :param relaxation: over-relaxation parameter in (0, 2), the eta and u updates use
+        relaxation * z + (1 - relaxation) * L_adj eta_prev instead of z; 1 for the plain iteration
+        """
+        if not 0 < relaxation < 2:
+            raise ValueError("relaxation must be in (0, 2)")
         N = self.__N
         A = self.__A
         B = self.__B
-        R = self.__R
-        P_seq = self.__P_seq
-        R_tilde_seq = self.__R_tilde_seq
-        K_seq = self.__K_seq
-        A_bar_seq = self.__A_bar_seq
+        workspace = self.__proximal_workspace()
         L_adj = self.__L_adj
         alpha = self.__alpha
-        epsilon = self.__epsilon
         n_x = A.shape[1]
         n_u = B.shape[1]
         n_z = N * (n_x + n_u) + n_x
@@ -758,61 +1278,76 @@ class Algorithms:
 
         proximal_lambda = alpha
         rho = 1 / proximal_lambda
-        z_next = z0
-        eta_next = eta0
-        u0 = 1 / rho * eta0
+        rho_exponent = 0  # rho = rho_tau^rho_exponent / alpha
+        num_rho_updates = 0
         u0 = z0 - L_adj @ eta0
-        u_next = u0
-        n_max = 10000
-
-        self.__residuals_cache = np.zeros((n_max, 2))
-        for i in range(n_max):
-            z_prev = z_next
-            eta_prev = eta_next
-            u_prev = u_next
-            z_next = core_online.proximal_of_h_online_part(prediction_horizon=N,
-                                                           proximal_lambda=proximal_lambda,
-                                                           initial_state=x0,
-                                                           initial_guess_vector=L_adj @ eta_prev - u_prev,
-                                                           state_dynamics=A,
-                                                           control_dynamics=B,
-                                                           control_weight=R,
-                                                           P_seq=P_seq,
-                                                           R_tilde_seq=R_tilde_seq,
-                                                           K_seq=K_seq,
-                                                           A_bar_seq=A_bar_seq)
-            eta_next = Algorithms.proj_to_c(self, z_next + u_prev)
-            u_next = u_prev + z_next - L_adj @ eta_next
-
-            s = rho * L_adj @ (eta_next - eta_prev)
-            r = z_next - L_adj @ eta_next
-            t_1 = np.linalg.norm(s)
-            t_2 = np.linalg.norm(r)
-            self.__residuals_cache[i, 0] = t_1
-            self.__residuals_cache[i, 1] = t_2
-            # epsilon_pri = epsilon * max(np.linalg.norm(z_next), np.linalg.norm(L_adj @ eta_next))
-            # epsilon_dual = epsilon * np.linalg.norm(eta_next)
-            if t_2 <= epsilon and t_1 <= epsilon:
+
+        # fixed buffers, swapped between iterations
+        z_next = np.array(z0, dtype=float)
+        eta_next = np.array(eta0, dtype=float)
+        eta_prev = np.empty(eta_next.shape)
+        u_next = np.array(u0, dtype=float)
+        u_prev = np.empty(u_next.shape)
+        z_tmp = np.empty(z_next.shape)
+        eta_tmp = np.empty(eta_next.shape)
+        z_relaxed = z_next if relaxation == 1 else np.empty(z_next.shape)
+        s = np.empty(z_next.shape)
+        r = np.empty(z_next.shape)
+        deadline = self.__start_iterations(2)
+        status = STATUS_MAX_ITERATIONS
+
+        for i in range(self.__max_iters):
+            eta_prev, eta_next = eta_next, eta_prev
+            u_prev, u_next = u_next, u_prev
+            L_adj_eta_prev = L_adj @ eta_prev
+            np.subtract(L_adj_eta_prev, u_prev, out=z_tmp)
+            workspace.proximal(x0, z_tmp, out=z_next)
+            if relaxation != 1:
+                np.subtract(z_next, L_adj_eta_prev, out=z_relaxed)
+                z_relaxed *= relaxation
+                z_relaxed += L_adj_eta_prev
+            np.add(z_relaxed, u_prev, out=eta_next)
+            Algorithms.proj_to_c(self, eta_next, out=eta_next)
+            L_adj_eta_next = L_adj @ eta_next
+            np.add(u_prev, z_relaxed, out=u_next)
+            u_next -= L_adj_eta_next
+
+            if self.__is_check(i):
+                np.subtract(eta_next, eta_prev, out=eta_tmp)
+                np.multiply(rho, L_adj @ eta_tmp, out=s)
+                np.subtract(z_next, L_adj_eta_next, out=r)
+                t_1 = _norm_2(s)
+                t_2 = _norm_2(r)
+                self.__record_residuals(t_1, t_2)
+                if self.__converged((t_1, t_2), lambda: Algorithms.__admm_scales(
+                        self, z_next, L_adj_eta_next, u_next, rho)):
+                    status = STATUS_CONVERGED
+                    break
+                if adaptive_rho and num_rho_updates < ADMM_MAX_RHO_UPDATES \
+                        and (t_2 > rho_mu * t_1 or t_1 > rho_mu * t_2):
+                    # residual balancing: a larger rho reduces the primal residual, a smaller one the dual
+                    rho_exponent += 1 if t_2 > rho_mu * t_1 else -1
+                    num_rho_updates += 1
+                    rho_next = rho_tau ** rho_exponent / alpha
+                    u_next *= rho / rho_next  # scaled dual variable
+                    rho = rho_next
+                    proximal_lambda = 1 / rho
+                    workspace = self.__proximal_workspace(alpha if rho_exponent == 0 else proximal_lambda)
+            if deadline is not None and time.perf_counter() >= deadline:
+                status = STATUS_TIME_BUDGET
                 break
-        self.__status = 0  # converge success
-        if i >= 9000:
-            self.__status = 1  # converge failed
+        self.__finish_iterations(status, i)
         self.__z = z_next
-        self.__residuals_cache = self.__residuals_cache[0:i, :]
+        self.__eta = eta_next
         return self
 
     def admm_scaling(self, scaling_factor):
         N = self.__N
         A = self.__A
         B = self.__B
-        R = self.__R
-        P_seq = self.__P_seq
-        R_tilde_seq = self.__R_tilde_seq
-        K_seq = self.__K_seq
-        A_bar_seq = self.__A_bar_seq
+        workspace = self.__proximal_workspace()
         L_adj = self.__L_adj
         alpha = self.__alpha
-        epsilon = self.__epsilon
         n_x = A.shape[1]
         n_u = B.shape[1]
         n_z = N * (n_x + n_u) + n_x
@@ -832,48 +1367,57 @@ class Algorithms:
 
         proximal_lambda = alpha
         rho = 1 / proximal_lambda
-        z_next = z0
-        eta_next = eta0
         u0 = 1 / rho * eta0
-        u_next = u0
-        n_max = 10000
-
-        for i in range(n_max):
-            z_prev = z_next
-            eta_prev = eta_next
-            u_prev = u_next
-            z_next = core_online.proximal_of_h_online_part(prediction_horizon=N,
-                                                           proximal_lambda=proximal_lambda,
-                                                           initial_state=x0,
-                                                           initial_guess_vector=L_adj @ eta_prev - u_prev,
-                                                           state_dynamics=A,
-                                                           control_dynamics=B,
-                                                           control_weight=R,
-                                                           P_seq=P_seq,
-                                                           R_tilde_seq=R_tilde_seq,
-                                                           K_seq=K_seq,
-                                                           A_bar_seq=A_bar_seq)
-            eta_next = Algorithms.proj_to_c(self, z_next + u_prev)
-            u_next = u_prev + z_next - L_adj @ eta_next
+
+        # fixed buffers, swapped between iterations
+        z_next = np.array(z0, dtype=float)
+        eta_next = np.array(eta0, dtype=float)
+        eta_prev = np.empty(eta_next.shape)
+        u_next = np.array(u0, dtype=float)
+        u_prev = np.empty(u_next.shape)
+        z_tmp = np.empty(z_next.shape)
+        z_next_scaling_back = np.empty(z_next.shape)
+        eta_prev_scaling_back = np.empty(z_next.shape)
+        eta_next_scaling_back = np.empty(z_next.shape)
+        s = np.empty(z_next.shape)
+        r = np.empty(z_next.shape)
+        deadline = self.__start_iterations(2)
+        status = STATUS_MAX_ITERATIONS
+
+        for i in range(self.__max_iters):
+            eta_prev, eta_next = eta_next, eta_prev
+            u_prev, u_next = u_next, u_prev
+            np.subtract(L_adj @ eta_prev, u_prev, out=z_tmp)
+            workspace.proximal(x0, z_tmp, out=z_next)
+            np.add(z_next, u_prev, out=eta_next)
+            Algorithms.proj_to_c(self, eta_next, out=eta_next)
+            L_adj_eta_next = L_adj @ eta_next
+            np.add(u_prev, z_next, out=u_next)
+            u_next -= L_adj_eta_next
 
             # Termination criteria
-            # scaling back
-            z_prev_scaling_back = z_prev * scaling_factor
-            eta_prev_scaling_back = L_adj @ eta_prev * scaling_factor
-            z_next_scaling_back = z_next * scaling_factor
-            eta_next_scaling_back = L_adj @ eta_next * scaling_factor
-
-            s = rho * (eta_next_scaling_back - eta_prev_scaling_back)
-            r = z_next_scaling_back - eta_next_scaling_back
-            t_1 = np.linalg.norm(s)
-            t_2 = np.linalg.norm(r)
-            # epsilon_pri = epsilon * max(np.linalg.norm(z_next_scaling_back), np.linalg.norm(eta_next_scaling_back))
-            # epsilon_dual = epsilon * np.linalg.norm(eta_next_scaling_back)
-            if t_1 <= epsilon and t_2 <= epsilon:
+            if self.__is_check(i):
+                # scaling back
+                np.multiply(L_adj @ eta_prev, scaling_factor, out=eta_prev_scaling_back)
+                np.multiply(z_next, scaling_factor, out=z_next_scaling_back)
+                np.multiply(L_adj_eta_next, scaling_factor, out=eta_next_scaling_back)
+
+                np.subtract(eta_next_scaling_back, eta_prev_scaling_back, out=s)
+                s *= rho
+                np.subtract(z_next_scaling_back, eta_next_scaling_back, out=r)
+                t_1 = _norm_2(s)
+                t_2 = _norm_2(r)
+                self.__record_residuals(t_1, t_2)
+                if self.__converged((t_1, t_2), lambda: Algorithms.__admm_scales(
+                        self, z_next_scaling_back, eta_next_scaling_back,
+                        np.multiply(u_next, scaling_factor, out=z_tmp), rho)):
+                    status = STATUS_CONVERGED
+                    break
+            if deadline is not None and time.perf_counter() >= deadline:
+                status = STATUS_TIME_BUDGET
                 break
-        self.__status = 0  # converge success
-        if i >= 9000:
-            self.__status = 1  # converge failed
-        self.__z = z_next_scaling_back
+        self.__finish_iterations(status, i)
+        self.__z = np.multiply(z_next, scaling_factor, out=z_next_scaling_back)
+        self.__eta = eta_next * scaling_factor
         return self
 
@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+
+# bump when the layout or the meaning of the stored arrays changes; entries of other versions are evicted
+CACHE_VERSION = 1
+
+# subdirectory of the cache directory holding the versions of the cache, nothing outside of it is ever removed
+CACHE_SUBDIRECTORY = "cpasocp-offline"
+
+
+class OfflineCache:
+    """
+    Persistent on-disk cache of offline products (Riccati sequences, Cholesky factors, alpha and ||L||)
+
+    Every entry is a directory of .npy files named by a problem fingerprint, in
+    <directory>/cpasocp-offline/v<CACHE_VERSION>. Entries are reloaded memory-mapped and evicted least recently used
+    first once the cache grows beyond max_size bytes. Other files in the directory are left untouched.
+    """
+
+    def __init__(self, directory, max_size=256 * 2 ** 20):
+        """
+        :param directory: cache directory, created if it does not exist
+        :param max_size: maximum total size of the cached entries in bytes
+        """
+        self.__directory = directory
+        self.__cache_directory = os.path.join(directory, CACHE_SUBDIRECTORY)
+        self.__version_directory = os.path.join(self.__cache_directory, "v%d" % CACHE_VERSION)
+        self.__max_size = max_size
+        self.__hits = 0
+        self.__misses = 0
+        os.makedirs(self.__version_directory, exist_ok=True)
+
+    # GETTERS
+    @property
+    def directory(self):
+        return self.__directory
+
+    @property
+    def version_directory(self):
+        """
+        :return: version_directory: directory of the entries of the current CACHE_VERSION
+        """
+        return self.__version_directory
+
+    @property
+    def max_size(self):
+        return self.__max_size
+
+    @property
+    def hits(self):
+        """Number of loads served from the cache"""
+        return self.__hits
+
+    @property
+    def misses(self):
+        """Number of loads that found no (valid) entry"""
+        return self.__misses
+
+    def __entry_path(self, key):
+        return os.path.join(self.__version_directory, key)
+
+    def load(self, key, names=None):
+        """
+        :param key: problem fingerprint of the entry
+        :param names: names of the arrays the entry must hold, an entry missing any of them is a miss; all arrays of
+        the entry if None
+        :return: dict of memory-mapped arrays, or None on a miss
+        """
+        path = self.__entry_path(key)
+        try:
+            if names is None:
+                names = [file_name[:-4] for file_name in os.listdir(path) if file_name.endswith(".npy")]
+            arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode='r') for name in names}
+            os.utime(path)  # least recently used order follows the modification time
+        except (OSError, ValueError):
+            arrays = {}
+        if not arrays:
+            self.__misses += 1
+            return None
+        self.__hits += 1
+        return arrays
+
+    def store(self, key, arrays):
+        """
+        :param key: problem fingerprint of the entry
+        :param arrays: dict of arrays (or scalars) to store under their names
+        """
+        path = self.__entry_path(key)
+        temporary_path = None
+        try:
+            temporary_path = tempfile.mkdtemp(prefix=".tmp-", dir=self.__version_directory)
+            for name, array in arrays.items():
+                np.save(os.path.join(temporary_path, name + ".npy"), np.asarray(array))
+            os.replace(temporary_path, path)
+        except OSError:
+            # written concurrently by another process, keep that entry; or the cache directory is not writable (any
+            # more), the caller goes on without caching
+            if temporary_path is not None:
+                shutil.rmtree(temporary_path, ignore_errors=True)
+        self.__evict()
+
+    def clear(self):
+        """Remove all entries, of all versions"""
+        shutil.rmtree(self.__cache_directory, ignore_errors=True)
+        os.makedirs(self.__version_directory, exist_ok=True)
+
+    def __evict(self):
+        """Remove entries of other versions, then the least recently used entries until max_size is respected"""
+        try:
+            versions = os.listdir(self.__cache_directory)
+            keys = os.listdir(self.__version_directory)
+        except OSError:
+            return
+        for version in versions:
+            version_path = os.path.join(self.__cache_directory, version)
+            if version_path != self.__version_directory and os.path.isdir(version_path) \
+                    and version[:1] == "v" and version[1:].isdigit():
+                shutil.rmtree(version_path, ignore_errors=True)
+        entries = []
+        total_size = 0
+        for key in keys:
+            path = self.__entry_path(key)
+            if key.startswith(".tmp-") or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(path, file_name)) for file_name in os.listdir(path))
+                entries.append((os.path.getmtime(path), size, path))
+            except OSError:
+                continue
+            total_size += size
+        for _, size, path in sorted(entries):
+            if total_size <= self.__max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+
+    def __str__(self):
+        return f"OfflineCache item; directory: {self.__directory}, hits: {self.__hits}, misses: {self.__misses}"
+
+    def __repr__(self):
+        return f"OfflineCache item; directory: {self.__directory}"
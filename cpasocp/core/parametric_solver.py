@@ -0,0 +1,130 @@
+import numpy as np
+
+
+class ParametricSolver:
+    """
+    Solver handle of an optimal control problem for varying initial states
+
+    L, L_adj, alpha and the offline part of the proximal of h are built once (see CPASOCP.solver),
+    so every call of solve only runs the iterations of the chosen algorithm.
+    """
+
+    def __init__(self, algorithms, method, *method_parameters):
+        """
+        :param algorithms: Algorithms object with the offline part set
+        :param method: name of the Algorithms method to run, e.g., 'chambolle_pock'
+        :param method_parameters: positional parameters of that method, e.g., the scaling factor
+        """
+        self.__algorithms = algorithms
+        self.__method = getattr(algorithms, method)
+        self.__method_parameters = method_parameters
+        self.__N = algorithms.prediction_horizon
+        self.__n_x = algorithms.state_dynamics.shape[1]
+        self.__n_u = algorithms.control_dynamics.shape[1]
+        self.__n_z = self.__N * (self.__n_x + self.__n_u) + self.__n_x
+        self.__n_L = algorithms.L_z.shape[0]
+        self.__n_c = algorithms.stage_constraints_state.shape[0]
+
+    # GETTERS
+    @property
+    def prediction_horizon(self):
+        return self.__N
+
+    @property
+    def state_dynamics(self):
+        return self.__algorithms.state_dynamics
+
+    @property
+    def control_dynamics(self):
+        return self.__algorithms.control_dynamics
+
+    @property
+    def z(self):
+        return self.__algorithms.z
+
+    @property
+    def eta(self):
+        return self.__algorithms.eta
+
+    @property
+    def iterations(self):
+        return self.__algorithms.iterations
+
+    @property
+    def alpha(self):
+        return self.__algorithms.alpha
+
+    @property
+    def status(self):
+        return self.__algorithms.status
+
+    @property
+    def status_message(self):
+        return self.__algorithms.status_message
+
+    @property
+    def residuals_cache(self):
+        return self.__algorithms.residuals_cache
+
+    @property
+    def epsilon_rel(self):
+        return self.__algorithms.epsilon_rel
+
+    @epsilon_rel.setter
+    def epsilon_rel(self, value):
+        self.__algorithms.epsilon_rel = value
+
+    def solve(self, initial_state, initial_guess_z=None, initial_guess_eta=None, max_iters=10000, time_budget=None,
+              check_every=1):
+        """
+        :param initial_state: initial state (x0) of the optimal control problem
+        :param initial_guess_z: vector initial guess of (z0), zeros if None
+        :param initial_guess_eta: vector initial guess of (eta0), zeros if None
+        :param max_iters: maximum number of iterations
+        :param time_budget: wall-clock budget in seconds, None for no budget
+        :param check_every: evaluate the termination criteria every check_every iterations
+        """
+        if initial_guess_z is None:
+            initial_guess_z = np.zeros((self.__n_z, 1))
+        if initial_guess_eta is None:
+            initial_guess_eta = np.zeros((self.__n_L, 1))
+        self.__algorithms.initial_state = initial_state
+        self.__algorithms.initial_guess_z = initial_guess_z
+        self.__algorithms.initial_guess_eta = initial_guess_eta
+        self.__algorithms.max_iters = max_iters
+        self.__algorithms.time_budget = time_budget
+        self.__algorithms.check_every = check_every
+        self.__method(*self.__method_parameters)
+        return self
+
+    def shifted_guess(self):
+        """
+        Initial guesses of the next receding horizon step: z and eta of the last solve shifted by one stage,
+        with the tail filled from the terminal stage (z: x_N and the last input, eta: the last stage block)
+
+        :return: initial_guess_z, initial_guess_eta
+        """
+        N = self.__N
+        n_x = self.__n_x
+        n_s = n_x + self.__n_u
+        n_c = self.__n_c
+        z = self.__algorithms.z
+        eta = self.__algorithms.eta
+        if z is None or eta is None:
+            raise ValueError("no solution to shift, call solve first")
+        z_shift = np.empty(z.shape)
+        z_shift[0: (N - 1) * n_s] = z[n_s: N * n_s]
+        z_shift[(N - 1) * n_s: (N - 1) * n_s + n_x] = z[N * n_s: self.__n_z]
+        z_shift[(N - 1) * n_s + n_x: N * n_s] = z[(N - 1) * n_s + n_x: N * n_s]
+        z_shift[N * n_s: self.__n_z] = z[N * n_s: self.__n_z]
+        eta_shift = np.empty(eta.shape)
+        eta_shift[0: (N - 1) * n_c] = eta[n_c: N * n_c]
+        eta_shift[(N - 1) * n_c: N * n_c] = eta[(N - 1) * n_c: N * n_c]
+        eta_shift[N * n_c: self.__n_L] = eta[N * n_c: self.__n_L]
+        return z_shift, eta_shift
+
+    def __str__(self):
+        return f"ParametricSolver item; method: {self.__method.__name__}"
+
+    def __repr__(self):
+        return f"ParametricSolver item; method: {self.__method.__name__}"
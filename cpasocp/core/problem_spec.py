@@ -7,8 +7,9 @@ import cpasocp.core.l_bfgs as core_l_bfgs
 import cpasocp.core.sets as core_sets
 import cpasocp.core.linear_operators as core_lin_op
 import cpasocp.core.ocp_algorithms as core_algo
+import cpasocp.core.offline_cache as core_cache
+import cpasocp.core.parametric_solver as core_solver
 import numpy as np
-import scipy as sp
 
 
 class CPASOCP:
@@ -39,6 +40,9 @@ class CPASOCP:
         self.__residuals_cache = None
         self.__z = None
         self.__alpha = None
+        self.__L_norm = None
+        self.__offline_cache = None
+        self.__epsilon_rel = 0.
         self.__status = None
         self.__scaling_factor = None
         self.__L_BFGS_k = None
@@ -65,10 +69,43 @@ class CPASOCP:
     def alpha(self):
         return self.__alpha
 
+    @property
+    def L_norm(self):
+        return self.__L_norm
+
+    @property
+    def offline_cache(self):
+        return self.__offline_cache
+
+    @property
+    def offline_cache_hits(self):
+        """
+        :return: number of offline products loaded from the on-disk cache (0 without cache)
+        """
+        return 0 if self.__offline_cache is None else self.__offline_cache.hits
+
+    @property
+    def offline_cache_misses(self):
+        """
+        :return: number of offline products computed because they were not in the on-disk cache (0 without cache)
+        """
+        return 0 if self.__offline_cache is None else self.__offline_cache.misses
+
     @property
     def status(self):
         return self.__status
 
+    @property
+    def status_message(self):
+        """
+        :return: status_message: why the last solve stopped, see ocp_algorithms.STATUS_MESSAGES
+        """
+        if self.__status is None:
+            return None
+        if np.ndim(self.__status) > 0:
+            return [core_algo.STATUS_MESSAGES[i] for i in self.__status]
+        return core_algo.STATUS_MESSAGES[self.__status]
+
     @property
     def residuals_cache(self):
         return self.__residuals_cache
@@ -85,29 +122,70 @@ class CPASOCP:
     def L_BFGS_grad_cache(self):
         return self.__L_BFGS_grad_cache
 
-    def __make_alpha(self, initial_guess_z):
-        """
-        :param initial_guess_z: vector initial guess of (z0) of Chambolle-Pock algorithm
-        """
-        n_z = initial_guess_z.shape[0]
-        L = core_lin_op.LinearOperator(self.__prediction_horizon, self.__A, self.__B, self.__Gamma_x, self.__Gamma_u,
-                                       self.__Gamma_N).make_L_op()
+    def __make_alpha(self):
+        n_z = (self.__prediction_horizon + 1) * self.__A.shape[1] + self.__prediction_horizon * self.__B.shape[1]
+        operator = core_lin_op.LinearOperator(self.__prediction_horizon, self.__A, self.__B, self.__Gamma_x,
+                                              self.__Gamma_u, self.__Gamma_N)
+        L = operator.make_L_op()
         L_z = L @ np.ones((n_z, 1))
-        L_adj = core_lin_op.LinearOperator(self.__prediction_horizon, self.__A, self.__B, self.__Gamma_x, self.__Gamma_u,
-                                           self.__Gamma_N).make_L_adj()
+        L_adj = operator.make_L_adj()
         # Choose α1, α2 > 0 such that α1α2∥L∥^2 < 1
-        eigs = np.real(sp.sparse.linalg.eigs(L_adj @ L, k=n_z - 2, return_eigenvectors=False))
-        L_norm = np.sqrt(max(eigs))
-        alpha = 0.99 / L_norm
+        cached = None
+        if self.__offline_cache is not None:
+            key = core_lin_op.problem_fingerprint("L_norm", self.__prediction_horizon, self.__A, self.__B,
+                                                  self.__Gamma_x, self.__Gamma_u, self.__Gamma_N)
+            cached = self.__offline_cache.load(key, ("L_norm", "alpha"))
+        if cached is None:
+            L_norm = operator.make_L_norm()
+            alpha = 0.99 / L_norm
+            if self.__offline_cache is not None:
+                self.__offline_cache.store(key, {"L_norm": L_norm, "alpha": alpha})
+        else:
+            L_norm = float(cached["L_norm"])
+            alpha = float(cached["alpha"])
         self.__L = L
         self.__L_z = L_z
         self.__L_adj = L_adj
+        self.__L_norm = L_norm
         self.__alpha = alpha
         return self
 
-    def __build_algorithm(self, epsilon, initial_state, initial_guess_z, initial_guess_eta):
+    def __make_offline_part(self):
+        """
+        Riccati offline part for proximal_lambda = alpha, reloaded from the on-disk cache when available
+        """
+        offline = core_offline.ProximalOfflinePart()
+        offline.prediction_horizon = self.__prediction_horizon
+        offline.state_dynamics = self.__A
+        offline.control_dynamics = self.__B
+        offline.stage_state_weight = self.__Q
+        offline.control_weight = self.__R
+        offline.terminal_state_weight = self.__P
+        offline.proximal_lambda = self.__alpha
+        stage_names = ("P_stages", "R_tilde_stages", "K_stages", "A_bar_stages", "R_tilde_chol_stages",
+                       "K_R_stages", "A_bar_P_B_stages")
+        if self.__offline_cache is None:
+            offline.algorithm()
+            return offline
+        key = core_lin_op.problem_fingerprint("offline", self.__A, self.__B, self.__Q, self.__R, self.__P,
+                                              self.__prediction_horizon, self.__alpha)
+        cached = self.__offline_cache.load(key, stage_names)
+        if cached is not None:
+            for name in stage_names:
+                setattr(offline, name, cached[name])
+        else:
+            offline.algorithm()
+            self.__offline_cache.store(key, {name: getattr(offline, name) for name in stage_names})
+        return offline
+
+    def __build_algorithm(self, epsilon, initial_state, initial_guess_z, initial_guess_eta, max_iters=10000,
+                          time_budget=None, check_every=1):
         algo = core_algo.Algorithms()
         algo.epsilon = epsilon
+        algo.epsilon_rel = self.__epsilon_rel
+        algo.max_iters = max_iters
+        algo.time_budget = time_budget
+        algo.check_every = check_every
         algo.initial_state = initial_state
         algo.initial_guess_z = initial_guess_z
         algo.initial_guess_eta = initial_guess_eta
@@ -120,21 +198,16 @@ class CPASOCP:
         algo.stage_constraints_sets = self.__C_t
         algo.terminal_constraints_state = self.__Gamma_N
         algo.terminal_constraints_set = self.__C_N
-        self.__make_alpha(initial_guess_z)
+        self.__make_alpha()
 
-        offline = core_offline.ProximalOfflinePart()
-        offline.prediction_horizon = self.__prediction_horizon
-        offline.state_dynamics = self.__A
-        offline.control_dynamics = self.__B
-        offline.stage_state_weight = self.__Q
-        offline.control_weight = self.__R
-        offline.terminal_state_weight = self.__P
-        offline.proximal_lambda = self.__alpha
-        offline.algorithm()
+        offline = self.__make_offline_part()
         P_seq = offline.P_seq
         R_tilde_seq = offline.R_tilde_seq
         K_seq = offline.K_seq
         A_bar_seq = offline.A_bar_seq
+        R_tilde_chol_seq = offline.R_tilde_chol_seq
+        K_R_seq = offline.K_R_seq
+        A_bar_P_B_seq = offline.A_bar_P_B_seq
 
         algo.alpha = self.__alpha
         algo.L = self.__L
@@ -144,8 +217,40 @@ class CPASOCP:
         algo.K_seq = K_seq
         algo.R_tilde_seq = R_tilde_seq
         algo.A_bar_seq = A_bar_seq
+        algo.R_tilde_chol_seq = R_tilde_chol_seq
+        algo.K_R_seq = K_R_seq
+        algo.A_bar_P_B_seq = A_bar_P_B_seq
+        algo.proximal_offline_cache = core_offline.ProximalOfflineCache(
+            self.__prediction_horizon, self.__A, self.__B, self.__Q, self.__R, self.__P).put(offline)
         return algo
 
+    # Offline cache --------------------------------------------------------------------------------------------------
+
+    def with_offline_cache(self, cache_directory, max_size=256 * 2 ** 20):
+        """
+        Persist ||L||, alpha and the offline Riccati products in cache_directory, so that later builds of the same
+        problem (also in other processes) reload them memory-mapped instead of recomputing them
+
+        :param cache_directory: directory of the cache, created if it does not exist
+        :param max_size: maximum total size of the cache in bytes, least recently used entries are evicted
+        """
+        self.__offline_cache = core_cache.OfflineCache(cache_directory, max_size)
+        return self
+
+    # Termination ------------------------------------------------------------------------------------------------------
+
+    def with_relative_tolerance(self, epsilon_rel):
+        """
+        Terminate when every residual is at most epsilon + epsilon_rel * (norm of the terms of the residual), instead
+        of the absolute tolerance epsilon only, see Algorithms.epsilon_rel
+
+        :param epsilon_rel: relative tolerance, 0 for the absolute criteria
+        """
+        if epsilon_rel < 0:
+            raise ValueError("epsilon_rel must be nonnegative")
+        self.__epsilon_rel = epsilon_rel
+        return self
+
     # Dynamics ---------------------------------------------------------------------------------------------------------
 
     def with_dynamics(self, state_dynamics, control_dynamics):
@@ -213,9 +318,33 @@ class CPASOCP:
 
     # Chambolle-Pock algorithm for Optimal Control Problems ------------------------------------------------------------
 
-    def chambolle_pock(self, epsilon, initial_state, initial_guess_z, initial_guess_eta):
-        algo = self.__build_algorithm(epsilon, initial_state, initial_guess_z, initial_guess_eta)
-        algo.chambolle_pock()
+    def chambolle_pock(self, epsilon, initial_state, initial_guess_z, initial_guess_eta, max_iters=10000,
+                       time_budget=None, check_every=1, relaxation=1., adaptive_step=False):
+        """
+        :param relaxation: Krasnosel'skii-Mann relaxation parameter in (0, 2), see Algorithms.chambolle_pock
+        :param adaptive_step: whether to balance the primal and dual step sizes, see Algorithms.chambolle_pock
+        """
+        algo = self.__build_algorithm(epsilon, initial_state, initial_guess_z, initial_guess_eta, max_iters,
+                                      time_budget, check_every)
+        algo.chambolle_pock(relaxation, adaptive_step)
+        self.__residuals_cache = algo.residuals_cache
+        self.__z = algo.z
+        self.__status = algo.status
+        return self
+
+    def chambolle_pock_batch(self, epsilon, initial_states, initial_guess_z, initial_guess_eta, max_iters=10000,
+                             time_budget=None, check_every=1):
+        """
+        :param initial_states: (n_x, K) matrix, one initial state per column
+        :param initial_guess_z: (n_z, K) matrix or (n_z, 1) vector used for every column
+        :param initial_guess_eta: (n_L, K) matrix or (n_L, 1) vector used for every column
+        :param max_iters: maximum number of iterations
+        :param time_budget: wall-clock budget in seconds, None for no budget
+        :param check_every: evaluate the termination criteria every check_every iterations
+        """
+        algo = self.__build_algorithm(epsilon, initial_states, initial_guess_z, initial_guess_eta, max_iters,
+                                      time_budget, check_every)
+        algo.chambolle_pock_batch()
         self.__residuals_cache = algo.residuals_cache
         self.__z = algo.z
         self.__status = algo.status
@@ -224,18 +353,38 @@ class CPASOCP:
     # SuperMann --------------------------------------------------------------------------------------------------------
 
     def cp_suppermann(self, epsilon, initial_state, initial_guess_z, initial_guess_eta, memory_num, c0, c1, q, beta,
-                      sigma, lambda_, dirction=None):
-        algo = self.__build_algorithm(epsilon, initial_state, initial_guess_z, initial_guess_eta)
+                      sigma, lambda_, dirction=None, max_iters=10000, time_budget=None, check_every=1):
+        algo = self.__build_algorithm(epsilon, initial_state, initial_guess_z, initial_guess_eta, max_iters,
+                                      time_budget, check_every)
         algo.chambolle_pock_supermann(memory_num, c0, c1, q, beta, sigma, lambda_, dirction)
         self.__residuals_cache = algo.residuals_cache
         self.__z = algo.z
         self.__status = algo.status
         return self
 
+    # Accelerated Chambolle-Pock algorithm -----------------------------------------------------------------------------
+
+    def cp_accelerated(self, epsilon, initial_state, initial_guess_z, initial_guess_eta, restart="residual",
+                       momentum_max=0.3, max_iters=10000, time_budget=None, check_every=1):
+        """
+        :param restart: restart scheme of the momentum, 'residual' or 'gradient', see
+        Algorithms.chambolle_pock_accelerated
+        :param momentum_max: bound of the inertial weight, below 1/3 for the convergence guarantee
+        """
+        algo = self.__build_algorithm(epsilon, initial_state, initial_guess_z, initial_guess_eta, max_iters,
+                                      time_budget, check_every)
+        algo.chambolle_pock_accelerated(restart, momentum_max)
+        self.__residuals_cache = algo.residuals_cache
+        self.__z = algo.z
+        self.__status = algo.status
+        return self
+
     # Chambolle-Pock algorithm scaling for Optimal Control Problems ----------------------------------------------------
 
-    def cp_scaling(self, epsilon, initial_state, initial_guess_z, initial_guess_eta):
-        algo = self.__build_algorithm(epsilon, initial_state, initial_guess_z, initial_guess_eta)
+    def cp_scaling(self, epsilon, initial_state, initial_guess_z, initial_guess_eta, max_iters=10000, time_budget=None,
+                   check_every=1):
+        algo = self.__build_algorithm(epsilon, initial_state, initial_guess_z, initial_guess_eta, max_iters,
+                                      time_budget, check_every)
         algo.chambolle_pock_scaling(self.__scaling_factor)
         self.__residuals_cache = algo.residuals_cache
         self.__z = algo.z
@@ -244,9 +393,15 @@ class CPASOCP:
 
     # ADMM for Optimal Control Problems --------------------------------------------------------------------------------
 
-    def admm(self, epsilon, initial_state, initial_guess_z, initial_guess_eta):
-        algo = self.__build_algorithm(epsilon, initial_state, initial_guess_z, initial_guess_eta)
-        algo.admm()
+    def admm(self, epsilon, initial_state, initial_guess_z, initial_guess_eta, max_iters=10000, time_budget=None,
+             check_every=1, adaptive_rho=False, relaxation=1.):
+        """
+        :param adaptive_rho: whether to adapt the penalty rho by residual balancing, see Algorithms.admm
+        :param relaxation: over-relaxation parameter in (0, 2), see Algorithms.admm
+        """
+        algo = self.__build_algorithm(epsilon, initial_state, initial_guess_z, initial_guess_eta, max_iters,
+                                      time_budget, check_every)
+        algo.admm(adaptive_rho, relaxation=relaxation)
         self.__z = algo.z
         self.__status = algo.status
         self.__residuals_cache = algo.residuals_cache
@@ -254,14 +409,51 @@ class CPASOCP:
 
     # ADMM scaling for Optimal Control Problems ------------------------------------------------------------------------
 
-    def admm_scaling(self, epsilon, initial_state, initial_guess_z, initial_guess_eta):
-        algo = self.__build_algorithm(epsilon, initial_state, initial_guess_z, initial_guess_eta)
+    def admm_scaling(self, epsilon, initial_state, initial_guess_z, initial_guess_eta, max_iters=10000,
+                     time_budget=None, check_every=1):
+        algo = self.__build_algorithm(epsilon, initial_state, initial_guess_z, initial_guess_eta, max_iters,
+                                      time_budget, check_every)
         algo.admm_scaling(self.__scaling_factor)
         self.__z = algo.z
         self.__status = algo.status
         self.__residuals_cache = algo.residuals_cache
         return self
 
+    # Solver handle ----------------------------------------------------------------------------------------------------
+
+    def solver(self, method, epsilon, *method_parameters):
+        """
+        Build L, alpha and the offline part once and return a handle solving the problem for any initial state
+
+        :param method: 'chambolle_pock', 'chambolle_pock_batch', 'cp_accelerated', 'cp_scaling', 'cp_suppermann',
+        'admm' or 'admm_scaling'
+        :param epsilon: termination tolerance
+        :param method_parameters: further parameters of 'cp_suppermann' in the order of cp_suppermann,
+        i.e., memory_num, c0, c1, q, beta, sigma, lambda_ and optionally dirction, the parameters of
+        Algorithms.chambolle_pock ('chambolle_pock', i.e., relaxation, adaptive_step, step_tau) or of
+        Algorithms.admm ('admm', i.e., adaptive_rho, rho_mu, rho_tau, relaxation), or restart and momentum_max of
+        'cp_accelerated'
+        """
+        algo = self.__build_algorithm(epsilon, None, None, None)
+        if method == "chambolle_pock":
+            return core_solver.ParametricSolver(algo, "chambolle_pock", *method_parameters)
+        elif method == "chambolle_pock_batch":
+            return core_solver.ParametricSolver(algo, "chambolle_pock_batch")
+        elif method == "cp_accelerated":
+            return core_solver.ParametricSolver(algo, "chambolle_pock_accelerated", *method_parameters)
+        elif method == "cp_scaling":
+            return core_solver.ParametricSolver(algo, "chambolle_pock_scaling", self.__scaling_factor)
+        elif method == "cp_suppermann":
+            if len(method_parameters) == 7:
+                method_parameters = method_parameters + (None,)
+            return core_solver.ParametricSolver(algo, "chambolle_pock_supermann", *method_parameters)
+        elif method == "admm":
+            return core_solver.ParametricSolver(algo, "admm", *method_parameters)
+        elif method == "admm_scaling":
+            return core_solver.ParametricSolver(algo, "admm_scaling", self.__scaling_factor)
+        else:
+            raise ValueError("solver method '%s' not supported" % method)
+
     # L-BFGS -----------------------------------------------------------------------------------------------------------
 
     def L_BFGS(self, epsilon, initial_state, memory_num):
@@ -1,7 +1,18 @@
+import collections
 import numpy as np
 import scipy as sp
 
 
+def _sequence_view(stages):
+    """(N, n, m) stage-major tensor as the (n, m, N) transposed view used by the tensor accessors"""
+    return None if stages is None else np.moveaxis(stages, 0, -1)
+
+
+def _stage_major(sequence):
+    """(n, m, N) tensor as a C-contiguous (N, n, m) stage-major tensor"""
+    return None if sequence is None else np.ascontiguousarray(np.moveaxis(sequence, -1, 0))
+
+
 class ProximalOfflinePart:
     def __init__(self):
         self.__prediction_horizon = None
@@ -11,10 +22,13 @@ class ProximalOfflinePart:
         self.__Q = None  # stage_state_weight
         self.__R = None  # control_weight
         self.__P = None  # terminal_state_weight
-        self.__P_seq = None
-        self.__R_tilde_seq = None
-        self.__K_seq = None
-        self.__A_bar_seq = None
+        self.__P_stages = None
+        self.__R_tilde_stages = None
+        self.__K_stages = None
+        self.__A_bar_stages = None
+        self.__R_tilde_chol_stages = None
+        self.__K_R_stages = None
+        self.__A_bar_P_B_stages = None
 
     @property
     def prediction_horizon(self):
@@ -97,45 +111,162 @@ class ProximalOfflinePart:
     def P_seq(self):
         """
         :return: P_seq: tensor, matrix sequence of (P) from proximal of h offline part
+        (transposed view of P_stages)
         """
-        return self.__P_seq
+        return _sequence_view(self.__P_stages)
 
     @P_seq.setter
     def P_seq(self, value):
-        self.__P_seq = value
+        self.__P_stages = _stage_major(value)
 
     @property
     def R_tilde_seq(self):
         """
         :return: R_tilde_seq: tensor, matrix sequence of (R) from proximal of h offline part
+        (transposed view of R_tilde_stages)
         """
-        return self.__R_tilde_seq
+        return _sequence_view(self.__R_tilde_stages)
 
     @R_tilde_seq.setter
     def R_tilde_seq(self, value):
-        self.__R_tilde_seq = value
+        self.__R_tilde_stages = _stage_major(value)
 
     @property
     def K_seq(self):
         """
         :return: K_seq: tensor, matrix sequence of (K) from proximal of h offline part
+        (transposed view of K_stages)
         """
-        return self.__K_seq
+        return _sequence_view(self.__K_stages)
 
     @K_seq.setter
     def K_seq(self, value):
-        self.__K_seq = value
+        self.__K_stages = _stage_major(value)
 
     @property
     def A_bar_seq(self):
         """
         :return: A_bar_seq: tensor, matrix sequence of (A_bar) from proximal of h offline part
+        (transposed view of A_bar_stages)
         """
-        return self.__A_bar_seq
+        return _sequence_view(self.__A_bar_stages)
 
     @A_bar_seq.setter
     def A_bar_seq(self, value):
-        self.__A_bar_seq = value
+        self.__A_bar_stages = _stage_major(value)
+
+    @property
+    def R_tilde_chol_seq(self):
+        """
+        :return: R_tilde_chol_seq: tensor, sequence of upper Cholesky factors of (R_tilde), as from cho_factor
+        (transposed view of R_tilde_chol_stages)
+        """
+        return _sequence_view(self.__R_tilde_chol_stages)
+
+    @R_tilde_chol_seq.setter
+    def R_tilde_chol_seq(self, value):
+        self.__R_tilde_chol_stages = _stage_major(value)
+
+    @property
+    def K_R_seq(self):
+        """
+        :return: K_R_seq: tensor, matrix sequence of (K^T (R + I/lambda)) from proximal of h offline part
+        (transposed view of K_R_stages)
+        """
+        return _sequence_view(self.__K_R_stages)
+
+    @K_R_seq.setter
+    def K_R_seq(self, value):
+        self.__K_R_stages = _stage_major(value)
+
+    @property
+    def A_bar_P_B_seq(self):
+        """
+        :return: A_bar_P_B_seq: tensor, matrix sequence of (A_bar^T P B) from proximal of h offline part
+        (transposed view of A_bar_P_B_stages)
+        """
+        return _sequence_view(self.__A_bar_P_B_stages)
+
+    @A_bar_P_B_seq.setter
+    def A_bar_P_B_seq(self, value):
+        self.__A_bar_P_B_stages = _stage_major(value)
+
+    @property
+    def P_stages(self):
+        """
+        :return: P_stages: C-contiguous (N + 1, n_x, n_x) tensor, stage t of P_seq at [t]
+        """
+        return self.__P_stages
+
+    @P_stages.setter
+    def P_stages(self, value):
+        self.__P_stages = value
+
+    @property
+    def R_tilde_stages(self):
+        """
+        :return: R_tilde_stages: C-contiguous (N, n_u, n_u) tensor, stage t of R_tilde_seq at [t]
+        """
+        return self.__R_tilde_stages
+
+    @R_tilde_stages.setter
+    def R_tilde_stages(self, value):
+        self.__R_tilde_stages = value
+
+    @property
+    def K_stages(self):
+        """
+        :return: K_stages: C-contiguous (N, n_u, n_x) tensor, stage t of K_seq at [t]
+        """
+        return self.__K_stages
+
+    @K_stages.setter
+    def K_stages(self, value):
+        self.__K_stages = value
+
+    @property
+    def A_bar_stages(self):
+        """
+        :return: A_bar_stages: C-contiguous (N, n_x, n_x) tensor, stage t of A_bar_seq at [t]
+        """
+        return self.__A_bar_stages
+
+    @A_bar_stages.setter
+    def A_bar_stages(self, value):
+        self.__A_bar_stages = value
+
+    @property
+    def R_tilde_chol_stages(self):
+        """
+        :return: R_tilde_chol_stages: C-contiguous (N, n_u, n_u) tensor, stage t of R_tilde_chol_seq at [t]
+        """
+        return self.__R_tilde_chol_stages
+
+    @R_tilde_chol_stages.setter
+    def R_tilde_chol_stages(self, value):
+        self.__R_tilde_chol_stages = value
+
+    @property
+    def K_R_stages(self):
+        """
+        :return: K_R_stages: C-contiguous (N, n_x, n_u) tensor, stage t of K_R_seq at [t]
+        """
+        return self.__K_R_stages
+
+    @K_R_stages.setter
+    def K_R_stages(self, value):
+        self.__K_R_stages = value
+
+    @property
+    def A_bar_P_B_stages(self):
+        """
+        :return: A_bar_P_B_stages: C-contiguous (N, n_x, n_u) tensor, stage t of A_bar_P_B_seq at [t]
+        """
+        return self.__A_bar_P_B_stages
+
+    @A_bar_P_B_stages.setter
+    def A_bar_P_B_stages(self, value):
+        self.__A_bar_P_B_stages = value
 
     def algorithm(self):
         """Construct the offline algorithm"""
@@ -147,23 +278,126 @@ class ProximalOfflinePart:
         n_x = A.shape[1]
         n_u = B.shape[1]
         N = self.__prediction_horizon
-        P_seq = np.zeros((n_x, n_x, N + 1))  # tensor
-        R_tilde_seq = np.zeros((n_u, n_u, N))  # tensor
-        K_seq = np.zeros((n_u, n_x, N))  # tensor
-        A_bar_seq = np.zeros((n_x, n_x, N))  # tensor
+        # stage-major tensors, stage t at [t]
+        P_stages = np.zeros((N + 1, n_x, n_x))
+        R_tilde_stages = np.zeros((N, n_u, n_u))
+        K_stages = np.zeros((N, n_u, n_x))
+        A_bar_stages = np.zeros((N, n_x, n_x))
+        R_tilde_chol_stages = np.zeros((N, n_u, n_u))
+        K_R_stages = np.zeros((N, n_x, n_u))
+        A_bar_P_B_stages = np.zeros((N, n_x, n_u))
+        R_lambda = R + 1 / self.__lambda * np.eye(n_u)
         P_0 = P + 1 / self.__lambda * np.eye(n_x)
-        P_seq[:, :, N] = P_0
-
-        for i in range(N):
-            R_tilde_seq[:, :, N - i - 1] = R + 1 / self.__lambda * np.eye(n_u) + B.T @ P_seq[:, :, N - i] @ B
-            c, low = sp.linalg.cho_factor(R_tilde_seq[:, :, N - i - 1])
-            K_seq[:, :, N - i - 1] = sp.linalg.cho_solve((c, low), - B.T @ P_seq[:, :, N - i] @ A)
-            A_bar_seq[:, :, N - i - 1] = A + B @ K_seq[:, :, N - i - 1]
-            P_seq[:, :, N - i - 1] = Q + 1 / self.__lambda * np.eye(n_x) + K_seq[:, :, N - i - 1].T \
-                                     @ (R + 1 / self.__lambda * np.eye(n_u)) @ K_seq[:, :, N - i - 1] \
-                                     + A_bar_seq[:, :, N - i - 1].T @ P_seq[:, :, N - i] @ A_bar_seq[:, :, N - i - 1]
-        self.__P_seq = P_seq
-        self.__R_tilde_seq = R_tilde_seq
-        self.__K_seq = K_seq
-        self.__A_bar_seq = A_bar_seq
+        P_stages[N] = P_0
+
+        for t in range(N - 1, -1, -1):
+            R_tilde_stages[t] = R_lambda + B.T @ P_stages[t + 1] @ B
+            c, low = sp.linalg.cho_factor(R_tilde_stages[t])
+            R_tilde_chol_stages[t] = c
+            K_stages[t] = sp.linalg.cho_solve((c, low), - B.T @ P_stages[t + 1] @ A)
+            A_bar_stages[t] = A + B @ K_stages[t]
+            K_R_stages[t] = K_stages[t].T @ R_lambda
+            A_bar_P_B_stages[t] = A_bar_stages[t].T @ P_stages[t + 1] @ B
+            P_stages[t] = Q + 1 / self.__lambda * np.eye(n_x) + K_R_stages[t] @ K_stages[t] \
+                + A_bar_stages[t].T @ P_stages[t + 1] @ A_bar_stages[t]
+        self.__P_stages = P_stages
+        self.__R_tilde_stages = R_tilde_stages
+        self.__K_stages = K_stages
+        self.__A_bar_stages = A_bar_stages
+        self.__R_tilde_chol_stages = R_tilde_chol_stages
+        self.__K_R_stages = K_R_stages
+        self.__A_bar_P_B_stages = A_bar_P_B_stages
         return self
+
+
+class ProximalOfflineCache:
+    """
+    Least recently used cache of ProximalOfflinePart factorizations keyed by proximal_lambda
+
+    Used by the algorithms that change the proximal parameter during a solve, so that returning to a
+    previous value does not repeat the Riccati recursion.
+    """
+
+    def __init__(self, prediction_horizon, state_dynamics, control_dynamics, stage_state_weight, control_weight,
+                 terminal_state_weight, max_size=8):
+        """
+        :param prediction_horizon: prediction horizon (N) of dynamic system
+        :param state_dynamics: matrix A, describing the state dynamics
+        :param control_dynamics: matrix B, describing control dynamics
+        :param stage_state_weight: matrix (Q), stage state cost matrix
+        :param control_weight: scalar or matrix (R), input cost matrix or scalar
+        :param terminal_state_weight: matrix (P), terminal state cost matrix
+        :param max_size: maximum number of cached factorizations
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.__prediction_horizon = prediction_horizon
+        self.__A = state_dynamics
+        self.__B = control_dynamics
+        self.__Q = stage_state_weight
+        self.__R = control_weight
+        self.__P = terminal_state_weight
+        self.__max_size = max_size
+        self.__parts = collections.OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    # GETTERS
+    @property
+    def max_size(self):
+        return self.__max_size
+
+    @property
+    def hits(self):
+        """Number of factorizations served from the cache"""
+        return self.__hits
+
+    @property
+    def misses(self):
+        """Number of factorizations computed"""
+        return self.__misses
+
+    def __len__(self):
+        return len(self.__parts)
+
+    def __contains__(self, proximal_lambda):
+        return float(proximal_lambda) in self.__parts
+
+    def put(self, offline_part):
+        """
+        :param offline_part: ProximalOfflinePart of this problem, already computed
+        """
+        self.__parts[float(offline_part.proximal_lambda)] = offline_part
+        self.__parts.move_to_end(float(offline_part.proximal_lambda))
+        while len(self.__parts) > self.__max_size:
+            self.__parts.popitem(last=False)
+        return self
+
+    def get(self, proximal_lambda):
+        """
+        :param proximal_lambda: a parameter (lambda) for proximal operator
+        :return: ProximalOfflinePart for proximal_lambda, computed on a miss
+        """
+        key = float(proximal_lambda)
+        if key in self.__parts:
+            self.__hits += 1
+            self.__parts.move_to_end(key)
+            return self.__parts[key]
+        self.__misses += 1
+        offline = ProximalOfflinePart()
+        offline.prediction_horizon = self.__prediction_horizon
+        offline.state_dynamics = self.__A
+        offline.control_dynamics = self.__B
+        offline.stage_state_weight = self.__Q
+        offline.control_weight = self.__R
+        offline.terminal_state_weight = self.__P
+        offline.proximal_lambda = key
+        offline.algorithm()
+        self.put(offline)
+        return offline
+
+    def __str__(self):
+        return f"ProximalOfflineCache item; size: {len(self.__parts)}, hits: {self.__hits}, misses: {self.__misses}"
+
+    def __repr__(self):
+        return f"ProximalOfflineCache item; max size: {self.__max_size}"
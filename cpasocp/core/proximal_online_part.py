@@ -2,9 +2,157 @@ import numpy as np
 import scipy as sp
 
 
+def _fused_offline_sequences(proximal_lambda, control_dynamics, control_weight, P_seq, R_tilde_seq, K_seq,
+                             A_bar_seq):
+    """
+    Cholesky factors of (R_tilde), (K^T (R + I/lambda)) and (A_bar^T P B) for offline data that do not provide them
+    """
+    B = control_dynamics
+    n_u = B.shape[1]
+    N = K_seq.shape[2]
+    R_lambda = control_weight + 1 / proximal_lambda * np.eye(n_u)
+    R_tilde_chol_seq = np.zeros(R_tilde_seq.shape)  # tensor
+    K_R_seq = np.zeros((K_seq.shape[1], n_u, N))  # tensor
+    A_bar_P_B_seq = np.zeros((K_seq.shape[1], n_u, N))  # tensor
+    for t in range(N):
+        R_tilde_chol_seq[:, :, t] = sp.linalg.cho_factor(R_tilde_seq[:, :, t])[0]
+        K_R_seq[:, :, t] = K_seq[:, :, t].T @ R_lambda
+        A_bar_P_B_seq[:, :, t] = A_bar_seq[:, :, t].T @ P_seq[:, :, t + 1] @ B
+    return R_tilde_chol_seq, K_R_seq, A_bar_P_B_seq
+
+
+class ProximalOnlineWorkspace:
+    """
+    Online part of proximal of h with preallocated buffers, created once per solver
+    """
+
+    def __init__(self, prediction_horizon, proximal_lambda, state_dynamics, control_dynamics, control_weight, P_seq,
+                 R_tilde_seq, K_seq, A_bar_seq, R_tilde_chol_seq=None, K_R_seq=None, A_bar_P_B_seq=None):
+        """
+        :param prediction_horizon: prediction horizon (N) of dynamic system
+        :param proximal_lambda: a parameter lambda for proximal operator
+        :param state_dynamics: matrix (A), describing the state dynamics
+        :param control_dynamics: matrix (B), describing control dynamics
+        :param control_weight: scalar or matrix (R), input cost matrix or scalar
+        :param P_seq: tensor, matrix sequence of (P) from proximal of h offline part
+        :param R_tilde_seq: tensor, matrix sequence of (R_tilde) from proximal of h offline part
+        :param K_seq: tensor, matrix sequence of (K) from proximal of h offline part
+        :param A_bar_seq: tensor, matrix sequence of (A_bar) from proximal of h offline part
+        :param R_tilde_chol_seq: tensor, sequence of Cholesky factors of (R_tilde) from proximal of h offline part
+        :param K_R_seq: tensor, matrix sequence of (K^T (R + I/lambda)) from proximal of h offline part
+        :param A_bar_P_B_seq: tensor, matrix sequence of (A_bar^T P B) from proximal of h offline part
+
+        If the last three are not given, they are computed from the other offline sequences.
+        """
+        N = prediction_horizon
+        A = state_dynamics
+        B = control_dynamics
+        n_x = A.shape[1]
+        n_u = B.shape[1]
+        if R_tilde_chol_seq is None or K_R_seq is None or A_bar_P_B_seq is None:
+            R_tilde_chol_seq, K_R_seq, A_bar_P_B_seq = _fused_offline_sequences(proximal_lambda, B, control_weight,
+                                                                                P_seq, R_tilde_seq, K_seq, A_bar_seq)
+        self.__N = N
+        self.__n_x = n_x
+        self.__n_u = n_u
+        self.__n_z = N * (n_x + n_u) + n_x
+        self.__inv_lambda = 1 / proximal_lambda
+        self.__A = A
+        self.__B = B
+        self.__B_T = np.ascontiguousarray(B.T)
+
+        # stage-indexed, C-contiguous copies of the offline sequences used by the recursions
+        self.__R_tilde_chol = np.ascontiguousarray(np.moveaxis(R_tilde_chol_seq, 2, 0))
+        self.__K = np.ascontiguousarray(np.moveaxis(K_seq, 2, 0))
+        self.__K_T = np.ascontiguousarray(np.moveaxis(K_seq, 2, 0).transpose(0, 2, 1))
+        self.__A_bar_T = np.ascontiguousarray(np.moveaxis(A_bar_seq, 2, 0).transpose(0, 2, 1))
+        self.__K_R_A_bar_P_B = np.ascontiguousarray(np.moveaxis(K_R_seq + A_bar_P_B_seq, 2, 0))
+        self.__potrs = sp.linalg.get_lapack_funcs('potrs', (self.__R_tilde_chol,))
+
+        # buffers for one column, reallocated when the number of columns changes
+        self.__allocate(1)
+
+    def __allocate(self, num_columns):
+        N = self.__N
+        self.__num_columns = num_columns
+        # d is stored (N, K, n_u) so that d[t].T is an F-contiguous (n_u, K) block which potrs solves in place
+        self.__d = np.zeros((N, num_columns, self.__n_u))
+        self.__q = np.zeros((self.__n_x, num_columns))
+        self.__q_next = np.zeros((self.__n_x, num_columns))
+        self.__x_tmp = np.zeros((self.__n_x, num_columns))
+        self.__u_tmp = np.zeros((self.__n_u, num_columns))
+
+    def proximal(self, initial_state, initial_guess_vector, out=None):
+        """
+        :param initial_state: initial state of dynamic system, (n_x,), (n_x, 1) or (n_x, K)
+        :param initial_guess_vector: initial guess vector w for proximal process, (n_z, 1) or (n_z, K) for K problems
+        :param out: optional (n_z, K) array the proximal of h at w is written into; it may be w itself
+        """
+        N = self.__N
+        n_x = self.__n_x
+        n_u = self.__n_u
+        n_z = self.__n_z
+        inv_lambda = self.__inv_lambda
+        w = initial_guess_vector
+        x_0 = initial_state
+
+        if w.shape[0] != n_z:
+            raise ValueError("Initial guess vector w row is not correct")
+        if x_0.shape[0] != n_x:
+            raise ValueError("Initial state x0 row is not correct")
+        w = np.reshape(w, (n_z, -1))
+        k = w.shape[1]
+        if k != self.__num_columns:
+            self.__allocate(k)
+        if out is None:
+            out = np.empty((n_z, k))
+
+        w_stages = w[0: N * (n_x + n_u)].reshape((N, n_x + n_u, k))
+        d = self.__d
+        q = self.__q
+        q_next = self.__q_next
+        x_tmp = self.__x_tmp
+        u_tmp = self.__u_tmp
+
+        # backward pass, reads all of w before anything is written to out
+        np.multiply(w[N * (n_x + n_u): n_z], - inv_lambda, out=q_next)
+        for t in range(N - 1, -1, -1):
+            chi = w_stages[t, 0: n_x]
+            v = w_stages[t, n_x: n_x + n_u]
+            d_t = d[t].T
+            np.matmul(self.__B_T, q_next, out=d_t)
+            np.multiply(v, inv_lambda, out=u_tmp)
+            np.subtract(u_tmp, d_t, out=d_t)
+            self.__potrs(self.__R_tilde_chol[t], d_t, lower=0, overwrite_b=1)
+            np.matmul(self.__K_R_A_bar_P_B[t], d_t, out=q)
+            np.matmul(self.__K_T[t], v, out=x_tmp)
+            x_tmp += chi
+            x_tmp *= inv_lambda
+            q -= x_tmp
+            np.matmul(self.__A_bar_T[t], q_next, out=x_tmp)
+            q += x_tmp
+            q, q_next = q_next, q
+
+        # forward pass, construct proximal of h at w
+        out_matrix = np.reshape(out, (n_z, k))
+        out_stages = out_matrix[0: N * (n_x + n_u)].reshape((N, n_x + n_u, k))
+        x_t = out_stages[0, 0: n_x]
+        np.copyto(x_t, np.reshape(x_0, (n_x, -1)))
+        for t in range(N):
+            u_t = out_stages[t, n_x: n_x + n_u]
+            np.matmul(self.__K[t], x_t, out=u_t)
+            u_t += d[t].T
+            x_next = out_stages[t + 1, 0: n_x] if t < N - 1 else out_matrix[N * (n_x + n_u): n_z]
+            np.matmul(self.__A, x_t, out=x_next)
+            np.matmul(self.__B, u_t, out=x_tmp)
+            x_next += x_tmp
+            x_t = x_next
+        return out
+
+
 def proximal_of_h_online_part(prediction_horizon, proximal_lambda, initial_state, initial_guess_vector, state_dynamics,
                               control_dynamics, control_weight, P_seq, R_tilde_seq, K_seq,
-                              A_bar_seq):
+                              A_bar_seq, R_tilde_chol_seq=None, K_R_seq=None, A_bar_P_B_seq=None):
     """
     :param prediction_horizon: prediction horizon (N) of dynamic system
     :param proximal_lambda: a parameter lambda for proximal operator
@@ -17,51 +165,17 @@ def proximal_of_h_online_part(prediction_horizon, proximal_lambda, initial_state
     :param R_tilde_seq: tensor, matrix sequence of (R_tilde) from proximal of h offline part
     :param K_seq: tensor, matrix sequence of (K) from proximal of h offline part
     :param A_bar_seq: tensor, matrix sequence of (A_bar) from proximal of h offline part
-    """
-    N = prediction_horizon
-    x_0 = initial_state
-    w = initial_guess_vector
-    A = state_dynamics
-    B = control_dynamics
-    R = control_weight
-    n_x = A.shape[1]
-    n_u = B.shape[1]
+    :param R_tilde_chol_seq: tensor, sequence of Cholesky factors of (R_tilde) from proximal of h offline part
+    :param K_R_seq: tensor, matrix sequence of (K^T (R + I/lambda)) from proximal of h offline part
+    :param A_bar_P_B_seq: tensor, matrix sequence of (A_bar^T P B) from proximal of h offline part
 
-    if w.shape[0] != N * (n_x + n_u) + n_x:
-        raise ValueError("Initial guess vector w row is not correct")
-    if x_0.shape[0] != n_x:
-        raise ValueError("Initial state x0 row is not correct")
-
-    chi_N = w[N * (n_x + n_u): N * (n_x + n_u) + n_x]
-    q_0 = - 1 / proximal_lambda * chi_N
-
-    q_seq = np.zeros((n_x, 1, N + 1))  # tensor
-    d_seq = np.zeros((n_u, 1, N))  # tensor
-    q_seq[:, :, N] = q_0
-
-    for t in range(N):
-        v = w[(N - t - 1) * (n_x + n_u) + n_x: (N - t) * (n_x + n_u)]
-        chi = w[(N - t - 1) * (n_x + n_u): (N - t - 1) * (n_x + n_u) + n_x]
-        c, low = sp.linalg.cho_factor(R_tilde_seq[:, :, N - t - 1])
-        d_seq[:, :, N - t - 1] = sp.linalg.cho_solve((c, low), 1 / proximal_lambda * v - B.T @ q_seq[:, :, N - t])
-        q_seq[:, :, N - t - 1] = K_seq[:, :, N - t - 1].T \
-                                 @ ((R + 1 / proximal_lambda * np.eye(n_u)) @ d_seq[:, :, N - t - 1]
-                                    - 1 / proximal_lambda * v) - 1 / proximal_lambda * chi \
-                                 + A_bar_seq[:, :, N - t - 1].T @ (P_seq[:, :, N - t] @ B @ d_seq[:, :, N - t - 1]
-                                                                   + q_seq[:, :, N - t])
-    x_seq = np.zeros((n_x, 1, N + 1))  # tensor
-    u_seq = np.zeros((n_u, 1, N))  # tensor
-    x_seq[:, :, N] = np.reshape(x_0, (n_x, 1))
-
-    # Construct Proximal of h at w
-    prox = np.reshape(x_seq[:, :, N], (n_x, 1))  # x_0
-    for t in range(N):
-        u_seq[:, :, N - t - 1] = K_seq[:, :, t] @ x_seq[:, :, N - t] + d_seq[:, :, t]
-        x_seq[:, :, N - t - 1] = A @ x_seq[:, :, N - t] + B @ u_seq[:, :, N - t - 1]
-        prox = np.vstack((prox, np.reshape(u_seq[:, :, N - t - 1], (n_u, 1))))
-        prox = np.vstack((prox, np.reshape(x_seq[:, :, N - t - 1], (n_x, 1))))
-
-    return prox
+    If the last three are not given, they are computed from the other offline sequences.
+    Solvers calling the proximal operator repeatedly should keep a ProximalOnlineWorkspace instead.
+    """
+    workspace = ProximalOnlineWorkspace(prediction_horizon, proximal_lambda, state_dynamics, control_dynamics,
+                                        control_weight, P_seq, R_tilde_seq, K_seq, A_bar_seq, R_tilde_chol_seq,
+                                        K_R_seq, A_bar_P_B_seq)
+    return workspace.proximal(initial_state, initial_guess_vector)
 
 
 def proximal_of_h_online_part_precondition(prediction_horizon, T_pre, Sigma_pre, initial_state, initial_guess_vector,
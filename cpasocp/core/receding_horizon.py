@@ -0,0 +1,124 @@
+import time
+import numpy as np
+
+
+class RecedingHorizonController:
+    """
+    Closed-loop (receding horizon) MPC driver around a ParametricSolver
+
+    Each step solves the optimal control problem from the current state, applies the first input and, with
+    warm_start, starts the next solve from the shifted primal and dual solution (see ParametricSolver.shifted_guess).
+    """
+
+    def __init__(self, solver, warm_start=True, max_iters=10000, time_budget=None, check_every=1):
+        """
+        :param solver: ParametricSolver, e.g., CPASOCP(...).solver('chambolle_pock', epsilon)
+        :param warm_start: whether to start every solve from the shifted previous solution
+        :param max_iters: maximum number of iterations per step
+        :param time_budget: wall-clock budget per step in seconds, None for no budget
+        :param check_every: evaluate the termination criteria every check_every iterations
+        """
+        self.__solver = solver
+        self.__warm_start = warm_start
+        self.__max_iters = max_iters
+        self.__time_budget = time_budget
+        self.__check_every = check_every
+        self.__n_x = solver.state_dynamics.shape[1]
+        self.__n_u = solver.control_dynamics.shape[1]
+        self.__states = []
+        self.__inputs = []
+        self.__iterations = []
+        self.__latencies = []
+        self.__statuses = []
+
+    # GETTERS
+    @property
+    def solver(self):
+        return self.__solver
+
+    @property
+    def states(self):
+        """
+        :return: states: (steps + 1, n_x) array of the simulated states, or (steps, n_x) outside simulate
+        """
+        return np.array(self.__states)
+
+    @property
+    def inputs(self):
+        """
+        :return: inputs: (steps, n_u) array of the applied inputs
+        """
+        return np.array(self.__inputs)
+
+    @property
+    def iterations(self):
+        """
+        :return: iterations: solver iterations per step
+        """
+        return np.array(self.__iterations)
+
+    @property
+    def latencies(self):
+        """
+        :return: latencies: wall-clock solve time per step in seconds
+        """
+        return np.array(self.__latencies)
+
+    @property
+    def statuses(self):
+        return np.array(self.__statuses)
+
+    def reset(self):
+        """Forget the warm start and the recorded steps"""
+        self.__states = []
+        self.__inputs = []
+        self.__iterations = []
+        self.__latencies = []
+        self.__statuses = []
+        return self
+
+    def control_action(self, state):
+        """
+        :param state: current state x
+        :return: first input u_0 of the optimal control sequence from x
+        """
+        state = np.reshape(np.asarray(state, dtype=float), self.__n_x)
+        if self.__warm_start and self.__iterations:
+            initial_guess_z, initial_guess_eta = self.__solver.shifted_guess()
+        else:
+            initial_guess_z, initial_guess_eta = None, None
+        start = time.perf_counter()
+        self.__solver.solve(state, initial_guess_z, initial_guess_eta, self.__max_iters, self.__time_budget,
+                            self.__check_every)
+        self.__latencies.append(time.perf_counter() - start)
+        self.__iterations.append(self.__solver.iterations)
+        self.__statuses.append(self.__solver.status)
+        control = self.__solver.z[self.__n_x: self.__n_x + self.__n_u, 0].copy()
+        self.__states.append(state)
+        self.__inputs.append(control)
+        return control
+
+    def simulate(self, initial_state, num_steps, plant=None):
+        """
+        :param initial_state: initial state of the closed loop
+        :param num_steps: number of receding horizon steps
+        :param plant: function (x, u) -> next state, the nominal dynamics A x + B u if None
+        """
+        A = self.__solver.state_dynamics
+        B = self.__solver.control_dynamics
+        self.reset()
+        state = np.reshape(np.asarray(initial_state, dtype=float), self.__n_x)
+        for _ in range(num_steps):
+            control = self.control_action(state)
+            if plant is None:
+                state = A @ state + B @ control
+            else:
+                state = np.reshape(np.asarray(plant(state, control), dtype=float), self.__n_x)
+        self.__states.append(state)
+        return self
+
+    def __str__(self):
+        return f"RecedingHorizonController item; steps: {len(self.__iterations)}, warm start: {self.__warm_start}"
+
+    def __repr__(self):
+        return f"RecedingHorizonController item; warm start: {self.__warm_start}"
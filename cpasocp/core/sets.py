@@ -18,36 +18,88 @@ def _check_dimension(set_type, set_dimension, vector):
         return vector_dimension
 
 
-def _check_rectangle_min_max(rect_min, rect_max, vector):
+def _check_rectangle_min_max(rect_min, rect_max):
     """
-    Function for Rectangle set min and max
+    Function for Rectangle set min and max, called once when the set is constructed
 
     If min > max, raise error.
     """
-    dimension = vector.size
-    if isinstance(rect_min, list) and isinstance(rect_max, list):
-        for i in range(dimension):
-            if rect_min[i] <= rect_max[i]:
-                pass
-            else:
-                raise ValueError('Rectangle set min max error: rect_min[%d] can not > rect_max[%d]' % (i, i))
-    elif (isinstance(rect_min, list) is False) and isinstance(rect_max, list):
-        for i in range(dimension):
-            if rect_min <= rect_max[i]:
-                pass
-            else:
-                raise ValueError('Rectangle set min max error: rect_min can not > rect_max[%d]' % i)
-    elif isinstance(rect_min, list) and (isinstance(rect_max, list) is False):
-        for i in range(dimension):
-            if rect_min[i] <= rect_max:
-                pass
-            else:
-                raise ValueError('Rectangle set min max error: rect_min[%d] can not > rect_max' % i)
-    else:
-        if rect_min <= rect_max:
-            pass
-        else:
+    lower = np.asarray(rect_min, dtype=float)
+    upper = np.asarray(rect_max, dtype=float)
+    if lower.ndim == 0 and upper.ndim == 0:
+        if lower > upper:
             raise ValueError('Rectangle set min max error: rect_min can not > rect_max')
+        return
+    dimension = min(lower.size if lower.ndim else upper.size, upper.size if upper.ndim else lower.size)
+    lower_broadcast = np.broadcast_to(lower.ravel()[0:dimension] if lower.ndim else lower, dimension)
+    upper_broadcast = np.broadcast_to(upper.ravel()[0:dimension] if upper.ndim else upper, dimension)
+    violations = np.flatnonzero(lower_broadcast > upper_broadcast)
+    if violations.size > 0:
+        i = violations[0]
+        if lower.ndim and upper.ndim:
+            raise ValueError('Rectangle set min max error: rect_min[%d] can not > rect_max[%d]' % (i, i))
+        elif upper.ndim:
+            raise ValueError('Rectangle set min max error: rect_min can not > rect_max[%d]' % i)
+        else:
+            raise ValueError('Rectangle set min max error: rect_min[%d] can not > rect_max' % i)
+
+
+def _rectangle_bound(bound, dimension, shape):
+    """
+    Rectangle bound (scalar or array) sliced to the first dimension entries and reshaped to shape
+
+    Bound lists longer than the vector are allowed, shorter ones raise error.
+    """
+    bound = np.asarray(bound, dtype=float)
+    if bound.ndim == 0:
+        return bound
+    if bound.size < dimension:
+        raise ValueError('Rectangle set dimension error: %d bounds, input vector dimension = %d'
+                         % (bound.size, dimension))
+    return bound.ravel()[0:dimension].reshape(shape)
+
+
+def _project_balls(block, radius, out):
+    """
+    Projection of the (g, n, K) block on balls, ball members along axis 1
+
+    :param radius: scalar or array broadcasting against (g, 1, K), e.g., (g, 1, 1)
+    """
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    with np.errstate(divide='ignore'):
+        scale = np.minimum(radius / norms, 1)
+    return np.multiply(block, scale, out=out)
+
+
+def _project_second_order_cones(block, out):
+    """
+    Projection of the (g, n, K) block on second order cones, cone members along axis 1
+    """
+    first_part = block[:, 0:-1]
+    last_part = block[:, -1:]
+    norms = np.linalg.norm(first_part, axis=1, keepdims=True)
+    last_projection = (norms + last_part) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        first_scale = last_projection / norms
+    inside = norms <= last_part
+    polar = (norms <= -last_part) & ~inside
+    first_scale = np.where(inside, 1, np.where(polar, 0, first_scale))
+    last_projection = np.where(inside, last_part, np.where(polar, 0, last_projection))
+    np.multiply(first_part, first_scale, out=out[:, 0:-1])
+    out[:, -1:] = last_projection
+    return out
+
+
+def _batch_of_rows(set_type, set_dimension, vectors, out):
+    """
+    Check a (k, n) array of set members and return it with its output as (k, n, 1) blocks
+    """
+    if vectors.ndim != 2:
+        raise ValueError('%s batch error: expected a (k, n) array, got shape %s' % (set_type, vectors.shape))
+    dimension = _check_dimension(set_type, set_dimension, vectors[0])
+    if out is None:
+        out = np.empty(vectors.shape)
+    return dimension, vectors[:, :, np.newaxis], out, out[:, :, np.newaxis]
 
 
 class Rectangle:
@@ -59,34 +111,44 @@ class Rectangle:
         :param rect_min: list or scalar, Rectangle min for v0,...,vn
         :param rect_max: list or scalar, Rectangle max for v0,...,vn
         :param dimension: scalar, dimension of input vector
+
+        The bounds are validated once and kept as arrays; project clips against them.
         """
+        _check_rectangle_min_max(rect_min, rect_max)
         self.__rect_min = rect_min
         self.__rect_max = rect_max
+        self.__lower = np.asarray(rect_min, dtype=float)
+        self.__upper = np.asarray(rect_max, dtype=float)
         self.__dimension = dimension
         self.__shape = None
+        self.__bounds_key = None
+        self.__bounds = None
 
-    def project(self, vector):
-        self.__dimension = _check_dimension(type(self), self.__dimension, vector)
-        _check_rectangle_min_max(self.__rect_min, self.__rect_max, vector)
+    def __shaped_bounds(self, vector):
+        """
+        Bounds sliced to the vector dimension (longer bound lists are allowed) and shaped to broadcast
+        against (n,), (n, 1) or (n, K) vectors, cached per dimension and number of axes
+        """
+        key = (self.__dimension, vector.ndim)
+        if key != self.__bounds_key:
+            shape = (self.__dimension,) + (1,) * (vector.ndim - 1)
+            self.__bounds_key = key
+            self.__bounds = (_rectangle_bound(self.__lower, self.__dimension, shape),
+                             _rectangle_bound(self.__upper, self.__dimension, shape))
+        return self.__bounds
+
+    def project(self, vector, out=None):
+        """
+        :param vector: (n,) or (n, 1) vector, or (n, K) matrix of column vectors
+        :param out: optional array the projection is written into; it may be vector itself
+        """
+        column = vector[:, 0] if vector.ndim == 2 else vector
+        self.__dimension = _check_dimension(type(self), self.__dimension, column)
         self.__shape = vector.shape
-        projection = np.empty(self.__shape)
-        if isinstance(self.__rect_min, list) and isinstance(self.__rect_max, list):
-            for i in range(self.__dimension):
-                projection[i] = max(self.__rect_min[i], vector[i])
-                projection[i] = min(self.__rect_max[i], projection[i])
-        elif (isinstance(self.__rect_min, list) is False) and isinstance(self.__rect_max, list):
-            for i in range(self.__dimension):
-                projection[i] = max(self.__rect_min, vector[i])
-                projection[i] = min(self.__rect_max[i], projection[i])
-        elif isinstance(self.__rect_min, list) and (isinstance(self.__rect_max, list) is False):
-            for i in range(self.__dimension):
-                projection[i] = max(self.__rect_min[i], vector[i])
-                projection[i] = min(self.__rect_max, projection[i])
-        else:
-            for i in range(self.__dimension):
-                projection[i] = max(self.__rect_min, vector[i])
-                projection[i] = min(self.__rect_max, projection[i])
-        return projection
+        lower, upper = self.__shaped_bounds(vector)
+        if out is None:
+            out = np.empty(self.__shape)
+        return np.clip(vector, lower, upper, out=out)
 
     # GETTERS
     @property
@@ -115,13 +177,23 @@ class Ball:
         self.__dimension = dimension
         self.__shape = None
 
-    def project(self, vector):
+    def project(self, vector, out=None):
+        """
+        :param vector: vector to be projected
+        :param out: optional array the projection is written into; it may be vector itself
+        """
         self.__dimension = _check_dimension(type(self), self.__dimension, vector)
         self.__shape = vector.shape
-        projection = np.empty(self.__shape)
-        for i in range(self.__dimension):
-            projection = min((self.__radius / np.linalg.norm(vector)), 1) * vector
-        return projection
+        return np.multiply(min((self.__radius / np.linalg.norm(vector)), 1), vector, out=out)
+
+    def project_batch(self, vectors, out=None):
+        """
+        :param vectors: (k, n) array, one ball member per row
+        :param out: optional (k, n) array the projections are written into; it may be vectors itself
+        """
+        self.__dimension, block, out, out_block = _batch_of_rows(type(self), self.__dimension, vectors, out)
+        _project_balls(block, self.__radius, out_block)
+        return out
 
     # GETTERS
     @property
@@ -129,6 +201,11 @@ class Ball:
         """Set dimension"""
         return self.__dimension
 
+    @property
+    def radius(self):
+        """Ball radius"""
+        return self.__radius
+
 
 class Real:
     """
@@ -139,11 +216,18 @@ class Real:
         self.__dimension = dimension
         self.__shape = None
 
-    def project(self, vector):
+    def project(self, vector, out=None):
+        """
+        :param vector: vector to be projected
+        :param out: optional array the projection is written into; it may be vector itself
+        """
         self.__dimension = _check_dimension(type(self), self.__dimension, vector)
         self.__shape = vector.shape
-        projection = vector.copy()
-        return projection
+        if out is None:
+            return vector.copy()
+        if out is not vector:
+            np.copyto(out, vector)
+        return out
 
     # GETTERS
     @property
@@ -161,11 +245,17 @@ class Zero:
         self.__dimension = dimension
         self.__shape = None
 
-    def project(self, vector):
+    def project(self, vector, out=None):
+        """
+        :param vector: vector to be projected
+        :param out: optional array the projection is written into; it may be vector itself
+        """
         self.__dimension = _check_dimension(type(self), self.__dimension, vector)
         self.__shape = vector.shape
-        projection = np.zeros(self.__dimension).reshape(self.__shape)
-        return projection
+        if out is None:
+            return np.zeros(self.__shape)
+        out.fill(0)
+        return out
 
     # GETTERS
     @property
@@ -183,13 +273,16 @@ class NonnegativeOrthant:
         self.__dimension = dimension
         self.__shape = None
 
-    def project(self, vector):
+    def project(self, vector, out=None):
+        """
+        :param vector: vector to be projected
+        :param out: optional array the projection is written into; it may be vector itself
+        """
         self.__dimension = _check_dimension(type(self), self.__dimension, vector)
         self.__shape = vector.shape
-        projection = np.empty(self.__shape)
-        for i in range(self.__dimension):
-            projection[i] = max(0, vector[i])
-        return projection
+        if out is None:
+            out = np.empty(self.__shape)
+        return np.maximum(vector, 0, out=out)
 
     # GETTERS
     @property
@@ -207,24 +300,38 @@ class SecondOrderCone:
         self.__dimension = dimension
         self.__shape = None
 
-    def project(self, vector):
+    def project(self, vector, out=None):
+        """
+        :param vector: vector to be projected
+        :param out: optional array the projection is written into; it may be vector itself
+        """
         self.__dimension = _check_dimension(type(self), self.__dimension, vector)
         self.__shape = vector.shape
-        last_part = vector[-1].reshape(1, 1)
+        if out is None:
+            out = np.empty(self.__shape)
+        last_part = vector.flat[-1]
         first_part = vector[0:-1]
         two_norm_of_first_part = np.linalg.norm(first_part)
         if two_norm_of_first_part <= last_part:
-            projection = vector.copy()
-            return projection
+            if out is not vector:
+                np.copyto(out, vector)
         elif two_norm_of_first_part <= -last_part:
-            projection = np.zeros(shape=self.__shape)
-            return projection
+            out.fill(0)
         else:
             projection_of_last_part = (two_norm_of_first_part + last_part) / 2
-            projection_of_first_part = projection_of_last_part * (first_part/two_norm_of_first_part)
-            projection = np.concatenate((projection_of_first_part,
-                                         projection_of_last_part)).reshape(self.__shape)
-            return projection
+            np.divide(first_part, two_norm_of_first_part, out=out[0:-1])
+            out[0:-1] *= projection_of_last_part
+            out[-1] = projection_of_last_part
+        return out
+
+    def project_batch(self, vectors, out=None):
+        """
+        :param vectors: (k, n) array, one cone member per row
+        :param out: optional (k, n) array the projections are written into; it may be vectors itself
+        """
+        self.__dimension, block, out, out_block = _batch_of_rows(type(self), self.__dimension, vectors, out)
+        _project_second_order_cones(block, out_block)
+        return out
 
     # GETTERS
     @property
@@ -233,6 +340,91 @@ class SecondOrderCone:
         return self.__dimension
 
 
+class _StackedProjection:
+    """
+    Projection plan of a Cartesian product of sets onto the stacked vector of all sets
+
+    The sets are grouped by type (and dimension for Balls and second order cones). Every group is projected in one
+    vectorized call: Rectangles are clipped against stacked bounds, Balls and second order cones use the norms of
+    their (g, n, K) block. A product of one group works on views, mixed products gather and scatter the group rows.
+    Sets of other types are projected one by one.
+    """
+
+    def __init__(self, sets, dimensions):
+        offsets = np.concatenate(([0], np.cumsum(dimensions))).astype(int)
+        self.__rows = int(offsets[-1])
+        groups = {}
+        for i in range(len(sets)):
+            set_type = type(sets[i]).__name__
+            key = (set_type, dimensions[i] if set_type in ('Ball', 'SecondOrderCone') else None)
+            groups.setdefault(key, []).append(i)
+        single = len(groups) == 1
+        self.__groups = []
+        for (set_type, n), indices in groups.items():
+            if set_type in ('Ball', 'SecondOrderCone'):
+                # (g, n) row indices of the group members, or None for views of the whole vector
+                rows = None if single else offsets[indices][:, np.newaxis] + np.arange(n)
+                radius = np.array([sets[i].radius for i in indices], dtype=float).reshape((len(indices), 1, 1)) \
+                    if set_type == 'Ball' else None
+                self.__groups.append((set_type, rows, (len(indices), n, radius)))
+            elif set_type in ('Rectangle', 'Real', 'Zero', 'NonnegativeOrthant'):
+                rows = None if single else np.concatenate([np.arange(offsets[i], offsets[i + 1]) for i in indices])
+                bounds = None
+                if set_type == 'Rectangle':
+                    lower = [np.broadcast_to(_rectangle_bound(sets[i].rect_min, dimensions[i], (dimensions[i],)),
+                                             dimensions[i]) for i in indices]
+                    upper = [np.broadcast_to(_rectangle_bound(sets[i].rect_max, dimensions[i], (dimensions[i],)),
+                                             dimensions[i]) for i in indices]
+                    bounds = (np.concatenate(lower)[:, np.newaxis], np.concatenate(upper)[:, np.newaxis])
+                self.__groups.append((set_type, rows, bounds))
+            else:
+                self.__groups.append((None, None, [(sets[i], offsets[i], offsets[i + 1]) for i in indices]))
+
+    def project(self, vector, out):
+        """
+        :param vector: stacked (n,) or (n, 1) vector, or (n, K) matrix of stacked column vectors
+        :param out: array of the same shape the projection is written into; it may be vector itself
+        """
+        matrix = vector if vector.ndim == 2 else vector[:, np.newaxis]
+        out_matrix = out if out.ndim == 2 else out[:, np.newaxis]
+        for set_type, rows, data in self.__groups:
+            if set_type in ('Ball', 'SecondOrderCone'):
+                g, n, radius = data
+                if rows is None:
+                    block = matrix.reshape((g, n, -1))
+                    out_block = out_matrix.reshape((g, n, -1))
+                else:
+                    block = matrix[rows]
+                    out_block = block
+                if set_type == 'Ball':
+                    _project_balls(block, radius, out_block)
+                else:
+                    _project_second_order_cones(block, out_block)
+                if rows is not None:
+                    out_matrix[rows] = out_block
+                elif not np.may_share_memory(out_block, out_matrix):
+                    # out is not contiguous, so the reshape above is a copy
+                    out_matrix[:] = out_block.reshape(out_matrix.shape)
+            elif set_type is not None:
+                block = matrix if rows is None else matrix[rows]
+                out_block = out_matrix if rows is None else block
+                if set_type == 'Rectangle':
+                    np.clip(block, data[0], data[1], out=out_block)
+                elif set_type == 'Real':
+                    np.copyto(out_block, block)
+                elif set_type == 'Zero':
+                    out_block.fill(0)
+                else:
+                    np.maximum(block, 0, out=out_block)
+                if rows is not None:
+                    out_matrix[rows] = out_block
+            else:
+                for k in range(matrix.shape[1]):
+                    for set_i, start, end in data:
+                        out_matrix[start:end, k: k + 1] = set_i.project(matrix[start:end, k: k + 1])
+        return out
+
+
 class Cartesian:
     """
     The Cartesian product of sets (set x set x ...)
@@ -252,19 +444,53 @@ class Cartesian:
             else:
                 self.__dimension += i.dimension
         self.__dimensions = [None] * self.__num_sets
+        self.__plan = None
+        self.__plan_rows = None
 
-    def project(self, list_of_vectors):
-        projection_list = []
+    def project(self, list_of_vectors, out=None):
+        """
+        :param list_of_vectors: list of the vectors to be projected on each set
+        :param out: optional array the stacked projection is written into; the vectors may be views of it
+        """
         for i in range(self.__num_sets):
             self.__dimensions[i] = _check_dimension(type(self.__sets[i]),
                                                     self.__sets[i].dimension,
                                                     list_of_vectors[i])
-            projection_list.append(self.__sets[i].project(list_of_vectors[i]))
-        projection = projection_list[0]
-        for i in range(1, self.__num_sets):
-            projection = np.vstack((projection, projection_list[i]))
         self.__dimension = sum(self.__dimensions)
-        return projection
+        if out is None:
+            shape = (self.__dimension,) + np.shape(list_of_vectors[0])[1:]
+            out = np.empty(shape)
+        start = 0
+        for i in range(self.__num_sets):
+            end = start + self.__dimensions[i]
+            self.__sets[i].project(list_of_vectors[i], out=out[start:end])
+            start = end
+        return out
+
+    def project_stacked(self, vector, out=None):
+        """
+        Projection of the stacked vector of all sets, e.g., the N stage blocks of the dual vector
+
+        Sets without a given dimension split the vector equally. The sets are projected in vectorized groups of one
+        type, see _StackedProjection.
+
+        :param vector: stacked (n,) or (n, 1) vector, or (n, K) matrix of stacked column vectors
+        :param out: optional array the projection is written into; it may be vector itself
+        """
+        rows = vector.shape[0]
+        if out is None:
+            out = np.empty(vector.shape)
+        if self.__plan_rows != rows:
+            dimensions = [i.dimension if i.dimension is not None else rows // self.__num_sets
+                          for i in self.__sets]
+            if sum(dimensions) != rows:
+                raise ValueError('%s set dimension error: set dimension = %d, input vector dimension = %d'
+                                 % (type(self), sum(dimensions), rows))
+            self.__dimensions = dimensions
+            self.__dimension = rows
+            self.__plan = _StackedProjection(self.__sets, dimensions)
+            self.__plan_rows = rows
+        return self.__plan.project(vector, out)
 
     # GETTERS
     @property
@@ -0,0 +1,102 @@
+import unittest
+import numpy as np
+import cpasocp as cpa
+import cpasocp.core.sets as core_sets
+
+
+class TestAlgorithms(unittest.TestCase):
+    prediction_horizon = 10
+    n_x = 3
+    n_u = 2
+    A = np.array([[0.9, 0.2, 0], [-0.2, 0.9, 0.1], [0, 0.1, 0.8]])
+    B = np.array([[1, 0], [0, 1], [0.5, 0.5]])
+    Q = 10 * np.eye(n_x)
+    R = np.eye(n_u)
+    P = 5 * np.eye(n_x)
+    rectangle = core_sets.Rectangle(rect_min=[-1] * (n_x + n_u), rect_max=[1] * (n_x + n_u))
+    stage_sets = core_sets.Cartesian([rectangle] * prediction_horizon)
+    terminal_set = core_sets.Rectangle(rect_min=[-1] * n_x, rect_max=[1] * n_x)
+    n_z = (prediction_horizon + 1) * n_x + prediction_horizon * n_u
+    epsilon = 1e-5
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+
+    def __problem(self):
+        return cpa.core.CPASOCP(self.prediction_horizon) \
+            .with_dynamics(self.A, self.B) \
+            .with_cost("Quadratic", self.Q, self.R, self.P) \
+            .with_constraints("Rectangle", self.stage_sets, self.terminal_set)
+
+    def test_termination(self):
+        initial_state = np.array([0.5, -0.2, 0.1])
+        for method in ["chambolle_pock", "admm"]:
+            solver = self.__problem().solver(method, self.epsilon)
+            reference = solver.solve(initial_state).z.copy()
+            iterations = solver.iterations
+            self.assertEqual(solver.status, cpa.core.STATUS_CONVERGED)
+            self.assertEqual(solver.residuals_cache.shape[0], iterations)
+
+            solver.solve(initial_state, max_iters=5)
+            self.assertEqual((solver.status, solver.iterations), (cpa.core.STATUS_MAX_ITERATIONS, 5))
+            self.assertEqual(solver.status_message, "maximum number of iterations reached")
+
+            solver.solve(initial_state, time_budget=1e-9)
+            self.assertEqual((solver.status, solver.iterations), (cpa.core.STATUS_TIME_BUDGET, 1))
+
+            solver.solve(initial_state, check_every=10)
+            self.assertEqual(solver.status, cpa.core.STATUS_CONVERGED)
+            self.assertEqual(solver.iterations % 10, 0)
+            self.assertEqual(solver.residuals_cache.shape[0], solver.iterations // 10)
+            self.assertTrue(np.allclose(solver.z, reference, atol=1e-4))
+        with self.assertRaises(ValueError):
+            self.__problem().solver("chambolle_pock", self.epsilon).solve(initial_state, max_iters=0)
+
+    def test_admm_adaptive_rho(self):
+        initial_state = np.array([0.5, -0.2, 0.1])
+        reference = self.__problem().solver("chambolle_pock", self.epsilon * 1e-2).solve(initial_state)
+        fixed = self.__problem().solver("admm", self.epsilon).solve(initial_state)
+        adaptive = self.__problem().solver("admm", self.epsilon, True).solve(initial_state)
+        self.assertEqual(adaptive.status, cpa.core.STATUS_CONVERGED)
+        self.assertLessEqual(adaptive.iterations, fixed.iterations)
+        self.assertTrue(np.allclose(adaptive.z, reference.z, atol=1e-4))
+
+    def test_relative_tolerance(self):
+        # the relative criteria are invariant to the magnitude of the states and the constraints
+        initial_state = np.array([0.5, -0.2, 0.1])
+        scale = 1e3
+        n_s = self.n_x + self.n_u
+        rectangle = core_sets.Rectangle(rect_min=[-scale] * n_s, rect_max=[scale] * n_s)
+        terminal_set = core_sets.Rectangle(rect_min=[-scale] * self.n_x, rect_max=[scale] * self.n_x)
+        large = cpa.core.CPASOCP(self.prediction_horizon) \
+            .with_dynamics(self.A, self.B) \
+            .with_cost("Quadratic", self.Q, self.R, self.P) \
+            .with_constraints("Rectangle", core_sets.Cartesian([rectangle] * self.prediction_horizon), terminal_set)
+        for method in ["chambolle_pock", "admm"]:
+            solver = self.__problem().with_relative_tolerance(self.epsilon).solver(method, 0).solve(initial_state)
+            solver_large = large.with_relative_tolerance(self.epsilon).solver(method, 0).solve(scale * initial_state)
+            self.assertEqual(solver.status, cpa.core.STATUS_CONVERGED)
+            self.assertEqual(solver_large.iterations, solver.iterations)
+            self.assertTrue(np.allclose(solver_large.z, scale * solver.z, rtol=1e-8, atol=1e-8 * scale))
+        with self.assertRaises(ValueError):
+            self.__problem().with_relative_tolerance(-1)
+
+    def test_chambolle_pock_adaptive_step(self):
+        # inactive constraints, eta stays 0 and a larger primal step tau is much faster
+        initial_state = np.array([0.9, -0.8, 0.7])
+        problem = cpa.core.CPASOCP(2 * self.prediction_horizon) \
+            .with_dynamics(1.1 * self.A, self.B) \
+            .with_cost("Quadratic", 0.01 * self.Q, 0.01 * self.R, self.P) \
+            .with_constraints("Rectangle", core_sets.Cartesian([self.rectangle] * 2 * self.prediction_horizon),
+                              self.terminal_set)
+        reference = problem.solver("chambolle_pock", self.epsilon * 1e-3).solve(initial_state)
+        fixed = problem.solver("chambolle_pock", self.epsilon).solve(initial_state)
+        adaptive = problem.solver("chambolle_pock", self.epsilon, 1., True).solve(initial_state)
+        self.assertEqual(adaptive.status, cpa.core.STATUS_CONVERGED)
+        self.assertLess(2 * adaptive.iterations, fixed.iterations)
+        self.assertTrue(np.allclose(adaptive.z, reference.z, atol=1e-4))
+
+
+if __name__ == '__main__':
+    unittest.main()
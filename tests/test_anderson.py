@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+import cpasocp as cpa
+
+
+class TestAnderson(unittest.TestCase):
+    n = 20
+    memory_num = 4
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+
+    def test_anderson_direction(self):
+        np.random.seed(1)
+        anderson = cpa.core.AndersonAcceleration(self.n, self.memory_num)
+        x = np.random.rand(self.n, 1)
+        self.assertTrue(np.array_equal(anderson.direction(x), -x))
+        # the QR factorization follows the ring buffer through several wrap-arounds
+        for k in range(11):
+            residual = np.random.rand(self.n, 1)
+            anderson.update(x, residual)
+            x = x + np.random.rand(self.n, 1)
+            S = anderson.s_matrix
+            Y = anderson.y_matrix
+            self.assertEqual(S.shape, (self.n, min(k, self.memory_num)))
+            if k > 0:
+                gamma = np.linalg.lstsq(Y, residual, rcond=None)[0]
+                self.assertTrue(np.allclose(anderson.direction(residual), -residual - (S - Y) @ gamma))
+
+        # a linearly dependent pair is not stored
+        anderson.reset()
+        s = np.random.rand(self.n, 1)
+        y = np.random.rand(self.n, 1)
+        anderson.add_difference(s, y).add_difference(2 * s, 2 * y)
+        self.assertEqual(anderson.num_columns, 1)
+        with self.assertRaises(ValueError):
+            cpa.core.AndersonAcceleration(self.n, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
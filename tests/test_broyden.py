@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+import cpasocp as cpa
+
+
+class TestBroyden(unittest.TestCase):
+    n = 20
+    memory_num = 4
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+
+    def test_broyden_secant(self):
+        np.random.seed(2)
+        broyden = cpa.core.RestartedBroyden(self.n, self.memory_num, theta_bar=1e-8)
+        residual = np.random.rand(self.n, 1)
+        self.assertTrue(np.array_equal(broyden.direction(residual), -residual))
+        for k in range(2 * self.memory_num + 1):
+            s = np.random.rand(self.n, 1)
+            y = s + 0.1 * np.random.rand(self.n, 1)
+            broyden.add_difference(s, y)
+            # every update satisfies the secant condition H y = s, and the memory restarts after memory_num updates
+            self.assertTrue(np.allclose(broyden.direction(y), -s))
+            self.assertEqual(broyden.num_columns, k % self.memory_num + 1)
+
+        broyden.reset()
+        x = np.random.rand(self.n, 1)
+        broyden.update(x, residual).update(x + 1, residual + 2)
+        self.assertEqual(broyden.num_columns, 1)
+        self.assertTrue(np.allclose(broyden.apply(2 * np.ones((self.n, 1))), np.ones((self.n, 1))))
+
+
+if __name__ == '__main__':
+    unittest.main()
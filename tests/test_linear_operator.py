@@ -46,6 +46,118 @@ class TestLinearOperators(unittest.TestCase):
             inner_2 = np.inner((L_adj @ y).T, z.T)[0, 0]
             self.assertAlmostEqual(inner_1, inner_2, delta=tol)
 
+    def test_linearoperators_stage_blocks(self):
+        # compare the block-structured operators against a per-stage evaluation
+        prediction_horizon = 20
+        n_x = 4
+        n_u = 3
+        n_c = 6
+        n_f = 5
+
+        A = np.array(np.random.rand(n_x, n_x))  # n x n matrices
+        B = np.array(np.random.rand(n_x, n_u))  # n x u matrices
+        Gamma_x = np.array(np.random.rand(n_c, n_x))  # n_c x n_x matrix
+        Gamma_u = np.array(np.random.rand(n_c, n_u))  # n_c x n_u matrix
+        Gamma_N = np.array(np.random.rand(n_f, n_x))  # n_f x n_x matrix
+
+        N = prediction_horizon
+        n_z = (N + 1) * n_x + N * n_u
+        n_y = N * n_c + n_f
+        z = np.array(np.random.rand(n_z, 1))
+        y = np.array(np.random.rand(n_y, 1))
+
+        L = core_lin_op.LinearOperator(prediction_horizon, A, B, Gamma_x, Gamma_u, Gamma_N).make_L_op()
+        L_adj = core_lin_op.LinearOperator(prediction_horizon, A, B, Gamma_x, Gamma_u, Gamma_N).make_L_adj()
+
+        L_z = np.zeros((n_y, 1))
+        L_adj_y = np.zeros((n_z, 1))
+        for i in range(N):
+            x_i = z[i * (n_x + n_u): i * (n_x + n_u) + n_x]
+            u_i = z[i * (n_x + n_u) + n_x: (i + 1) * (n_x + n_u)]
+            y_i = y[i * n_c: (i + 1) * n_c]
+            L_z[i * n_c: (i + 1) * n_c] = Gamma_x @ x_i + Gamma_u @ u_i
+            L_adj_y[i * (n_x + n_u): i * (n_x + n_u) + n_x] = Gamma_x.T @ y_i
+            L_adj_y[i * (n_x + n_u) + n_x: (i + 1) * (n_x + n_u)] = Gamma_u.T @ y_i
+        L_z[N * n_c: n_y] = Gamma_N @ z[N * (n_x + n_u): n_z]
+        L_adj_y[N * (n_x + n_u): n_z] = Gamma_N.T @ y[N * n_c: n_y]
+
+        self.assertTrue(np.array_equal(L_z, L @ z))
+        self.assertTrue(np.array_equal(L_adj_y, L_adj @ y))
+        self.assertEqual((n_y,), (L @ z[:, 0]).shape)
+
+        # several columns at once give the same result as column by column
+        Z = np.array(np.random.rand(n_z, 3))
+        L_Z = L @ Z
+        for j in range(3):
+            self.assertTrue(np.allclose(L_Z[:, [j]], L @ Z[:, [j]], rtol=0, atol=1e-12))
+
+    def test_linearoperators_identity_gamma(self):
+        prediction_horizon = 10
+        A = np.array([[1, 0.7], [-0.1, 1]])  # n x n matrices
+        B = np.array([[1], [0.5]])  # n x u matrices
+
+        N = prediction_horizon
+        n_x = A.shape[1]
+        n_u = B.shape[1]
+        n_z = (N + 1) * n_x + N * n_u
+
+        Gamma_x = np.vstack((np.eye(n_x), np.zeros((n_u, n_x))))
+        Gamma_u = np.vstack((np.zeros((n_x, n_u)), np.eye(n_u)))
+        Gamma_N = np.eye(n_x)
+        self.assertTrue(core_lin_op.is_identity_gamma(Gamma_x, Gamma_u, Gamma_N))
+        self.assertFalse(core_lin_op.is_identity_gamma(Gamma_x, Gamma_u, 2 * Gamma_N))
+        self.assertFalse(core_lin_op.is_identity_gamma(np.ones((n_x + n_u, n_x)), Gamma_u, Gamma_N))
+
+        operator = core_lin_op.LinearOperator(prediction_horizon, A, B, Gamma_x, Gamma_u, Gamma_N)
+        self.assertTrue(operator.identity_structure)
+        L = operator.make_L_op()
+        L_adj = operator.make_L_adj()
+        z = np.array(np.random.rand(n_z, 1))
+        self.assertTrue(np.array_equal(z, L @ z))
+        self.assertTrue(np.array_equal(z, L_adj @ z))
+        self.assertTrue(np.shares_memory(z, L @ z))
+
+        # a permuted terminal matrix is not an identity structure
+        operator = core_lin_op.LinearOperator(prediction_horizon, A, B, Gamma_x, Gamma_u, 1 * Gamma_N[:, [1, 0]])
+        self.assertFalse(operator.identity_structure)
+        self.assertEqual(n_z, operator.make_L_op().shape[0])
+
+    def test_linearoperators_norm(self):
+        prediction_horizon = 15
+        n_x = 5
+        n_u = 2
+        n_c = 6
+        n_f = 4
+        A = np.array(np.random.rand(n_x, n_x))  # n x n matrices
+        B = np.array(np.random.rand(n_x, n_u))  # n x u matrices
+        Gamma_x = np.array(np.random.rand(n_c, n_x))  # n_c x n_x matrix
+        Gamma_u = np.array(np.random.rand(n_c, n_u))  # n_c x n_u matrix
+        Gamma_N = np.array(np.random.rand(n_f, n_x))  # n_f x n_x matrix
+
+        # L is block diagonal, so ||L|| = max(||[Gamma_x Gamma_u]||, ||Gamma_N||)
+        L_norm = max(np.linalg.norm(np.hstack((Gamma_x, Gamma_u)), 2), np.linalg.norm(Gamma_N, 2))
+        operator = core_lin_op.LinearOperator(prediction_horizon, A, B, Gamma_x, Gamma_u, Gamma_N)
+        L_norm_estimate = operator.make_L_norm(tol=1e-8)
+        self.assertGreaterEqual(L_norm_estimate, L_norm)
+        self.assertAlmostEqual(L_norm_estimate, L_norm, delta=1e-3 * L_norm)
+
+        # memoized per problem fingerprint
+        operator = core_lin_op.LinearOperator(prediction_horizon, A.copy(), B.copy(), Gamma_x.copy(),
+                                              Gamma_u.copy(), Gamma_N.copy())
+        self.assertEqual(L_norm_estimate, operator.make_L_norm(tol=1e-8))
+
+        # the memo is bounded, the least recently used plants are forgotten
+        for k in range(core_lin_op.L_NORM_CACHE_SIZE + 2):
+            core_lin_op.LinearOperator(2, A, B, (k + 1) * Gamma_x, Gamma_u, Gamma_N).make_L_norm()
+        self.assertEqual(len(core_lin_op._L_NORM_CACHE), core_lin_op.L_NORM_CACHE_SIZE)
+
+        # identity structure
+        Gamma_x = np.vstack((np.eye(n_x), np.zeros((n_u, n_x))))
+        Gamma_u = np.vstack((np.zeros((n_x, n_u)), np.eye(n_u)))
+        Gamma_N = np.eye(n_x)
+        operator = core_lin_op.LinearOperator(prediction_horizon, A, B, Gamma_x, Gamma_u, Gamma_N)
+        self.assertEqual(1, operator.make_L_norm())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import cpasocp as cpa
+import cpasocp.core.offline_cache as core_cache
+
+
+class TestOfflineCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+
+    def setUp(self):
+        self.cache_directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
+
+    def test_offline_cache_entries(self):
+        cache = core_cache.OfflineCache(self.cache_directory, max_size=2000)
+        self.assertIsNone(cache.load("a"))
+        cache.store("a", {"x": np.arange(100.), "y": 2.0})
+        entry = cache.load("a")
+        self.assertTrue(np.array_equal(entry["x"], np.arange(100.)))
+        self.assertEqual(float(entry["y"]), 2.0)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # the least recently used entry is evicted once the size limit is exceeded
+        os.utime(os.path.join(cache.version_directory, "a"), (0, 0))
+        cache.store("b", {"x": np.arange(100.)})
+        cache.store("c", {"x": np.arange(100.)})
+        self.assertIsNone(cache.load("a"))
+        self.assertIsNotNone(cache.load("c"))
+
+        # entries of other versions are dropped
+        stale_directory = os.path.join(self.cache_directory, core_cache.CACHE_SUBDIRECTORY,
+                                       "v%d" % (core_cache.CACHE_VERSION + 1))
+        os.makedirs(stale_directory)
+        cache.store("d", {"x": np.zeros(1)})
+        self.assertFalse(os.path.exists(stale_directory))
+
+    def test_offline_cache_foreign_files(self):
+        # the cache never removes files it did not create, neither on eviction nor on clear
+        foreign_file = os.path.join(self.cache_directory, "notes.txt")
+        with open(foreign_file, "w") as file:
+            file.write("not a cache entry")
+        foreign_directories = [os.path.join(self.cache_directory, name) for name in ["venv", "vendor", "v0"]]
+        for directory in foreign_directories:
+            os.makedirs(directory)
+        cache = core_cache.OfflineCache(self.cache_directory, max_size=1000)
+        for key in ["a", "b", "c"]:
+            cache.store(key, {"x": np.arange(100.)})
+        cache.clear()
+        self.assertIsNone(cache.load("c"))
+        cache.store("d", {"x": np.zeros(1)})
+        self.assertTrue(os.path.isfile(foreign_file))
+        for directory in foreign_directories:
+            self.assertTrue(os.path.isdir(directory))
+
+    def test_offline_cache_incomplete_entries(self):
+        # an entry missing one of the requested arrays is a miss, and a cache directory removed underneath does not
+        # make store raise
+        cache = core_cache.OfflineCache(self.cache_directory)
+        cache.store("a", {"x": np.arange(10.)})
+        self.assertIsNone(cache.load("a", ("x", "y")))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertTrue(np.array_equal(cache.load("a", ("x",))["x"], np.arange(10.)))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        shutil.rmtree(self.cache_directory)
+        cache.store("b", {"x": np.zeros(1)})
+        self.assertIsNone(cache.load("b"))
+
+    def test_offline_cache_solution(self):
+        prediction_horizon = 10
+        n_x = 4
+        n_u = 2
+        A = 0.5 * np.random.rand(n_x, n_x)
+        B = np.random.rand(n_x, n_u)
+        Q = 10 * np.eye(n_x)
+        R = np.eye(n_u)
+        P = 5 * np.eye(n_x)
+        rectangle = cpa.core.Rectangle(rect_min=[-2] * (n_x + n_u), rect_max=[2] * (n_x + n_u))
+        stage_sets = cpa.core.Cartesian([rectangle] * prediction_horizon)
+        terminal_set = cpa.core.Rectangle(rect_min=[-2] * n_x, rect_max=[2] * n_x)
+        initial_state = 0.5 * np.random.rand(n_x)
+        n_z = (prediction_horizon + 1) * n_x + prediction_horizon * n_u
+        z0 = np.zeros((n_z, 1))
+        eta0 = np.zeros((prediction_horizon * (n_x + n_u) + n_x, 1))
+
+        def solve(cache_directory):
+            problem = cpa.core.CPASOCP(prediction_horizon) \
+                .with_dynamics(A, B) \
+                .with_cost("Quadratic", Q, R, P) \
+                .with_constraints("Rectangle", stage_sets, terminal_set)
+            if cache_directory is not None:
+                problem.with_offline_cache(cache_directory)
+            return problem.chambolle_pock(1e-6, initial_state, z0, eta0)
+
+        reference = solve(None)
+        first = solve(self.cache_directory)
+        self.assertEqual((first.offline_cache_hits, first.offline_cache_misses), (0, 2))
+        second = solve(self.cache_directory)
+        self.assertEqual((second.offline_cache_hits, second.offline_cache_misses), (2, 0))
+        self.assertEqual(second.alpha, reference.alpha)
+        self.assertEqual(second.L_norm, reference.L_norm)
+        self.assertTrue(np.array_equal(first.z, reference.z))
+        self.assertTrue(np.array_equal(second.z, reference.z))
+
+
+if __name__ == '__main__':
+    unittest.main()
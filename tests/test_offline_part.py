@@ -111,6 +111,79 @@ class TestSets(unittest.TestCase):
         P_seq = offline.P_seq
         print(P_seq[:, :, 0])
 
+    def test_offline_part_factors(self):
+        prediction_horizon = 20
+        proximal_lambda = 0.5
+        n_x = 6
+        n_u = 3
+        A = np.array(np.random.rand(n_x, n_x))  # n x n matrices
+        B = np.array(np.random.rand(n_x, n_u))  # n x u matrices
+        Q = 10 * np.eye(n_x)  # n x n matrix
+        R = np.eye(n_u)  # u x u matrix OR scalar
+        P = 5 * np.eye(n_x)  # n x n matrix
+
+        offline = core_offline.ProximalOfflinePart()
+        offline.prediction_horizon = prediction_horizon
+        offline.state_dynamics = A
+        offline.control_dynamics = B
+        offline.stage_state_weight = Q
+        offline.control_weight = R
+        offline.terminal_state_weight = P
+        offline.proximal_lambda = proximal_lambda
+        offline.algorithm()
+
+        for t in range(prediction_horizon):
+            chol = np.triu(offline.R_tilde_chol_seq[:, :, t])
+            self.assertTrue(np.allclose(chol.T @ chol, offline.R_tilde_seq[:, :, t]))
+            self.assertTrue(np.allclose(offline.K_R_seq[:, :, t],
+                                        offline.K_seq[:, :, t].T @ (R + 1 / proximal_lambda * np.eye(n_u))))
+            self.assertTrue(np.allclose(offline.A_bar_P_B_seq[:, :, t],
+                                        offline.A_bar_seq[:, :, t].T @ offline.P_seq[:, :, t + 1] @ B))
+
+        # stage-major storage, the tensor accessors are transposed views of it
+        self.assertEqual((prediction_horizon + 1, n_x, n_x), offline.P_stages.shape)
+        self.assertEqual((prediction_horizon, n_u, n_x), offline.K_stages.shape)
+        self.assertTrue(offline.K_stages.flags['C_CONTIGUOUS'])
+        self.assertTrue(np.shares_memory(offline.K_seq, offline.K_stages))
+        self.assertTrue(offline.K_seq[:, :, 3].flags['C_CONTIGUOUS'])
+        self.assertTrue(np.array_equal(offline.K_seq[:, :, 3], offline.K_stages[3]))
+        K_seq = offline.K_seq.copy()
+        offline.K_seq = K_seq
+        self.assertTrue(offline.K_stages.flags['C_CONTIGUOUS'])
+        self.assertTrue(np.array_equal(K_seq, offline.K_seq))
+
+    def test_offline_part_cache(self):
+        prediction_horizon = 10
+        n_x = 4
+        n_u = 2
+        A = np.array(np.random.rand(n_x, n_x))  # n x n matrices
+        B = np.array(np.random.rand(n_x, n_u))  # n x u matrices
+        Q = 10 * np.eye(n_x)  # n x n matrix
+        R = np.eye(n_u)  # u x u matrix OR scalar
+        P = 5 * np.eye(n_x)  # n x n matrix
+        cache = core_offline.ProximalOfflineCache(prediction_horizon, A, B, Q, R, P, max_size=2)
+
+        offline = cache.get(0.5)
+        reference = core_offline.ProximalOfflinePart()
+        reference.prediction_horizon = prediction_horizon
+        reference.state_dynamics = A
+        reference.control_dynamics = B
+        reference.stage_state_weight = Q
+        reference.control_weight = R
+        reference.terminal_state_weight = P
+        reference.proximal_lambda = 0.5
+        reference.algorithm()
+        self.assertTrue(np.array_equal(offline.K_stages, reference.K_stages))
+        self.assertTrue(np.array_equal(offline.P_stages, reference.P_stages))
+
+        # least recently used factorizations are dropped, cached ones are returned as they are
+        cache.get(0.25)
+        self.assertIs(cache.get(0.5), offline)
+        cache.get(1)
+        self.assertEqual((len(cache), cache.hits, cache.misses), (2, 1, 3))
+        self.assertIn(0.5, cache)
+        self.assertNotIn(0.25, cache)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -100,6 +100,36 @@ class TestOnlinePart(unittest.TestCase):
         error = np.linalg.norm(z_cp - z_online_part, np.inf)
         self.assertAlmostEqual(error, 0, delta=tol)
 
+        # with the Cholesky factors and fused products of the offline part
+        z_online_part_factors = core_online.proximal_of_h_online_part(prediction_horizon=prediction_horizon,
+                                                                      proximal_lambda=proximal_lambda,
+                                                                      initial_state=initial_state,
+                                                                      initial_guess_vector=z0,
+                                                                      state_dynamics=A,
+                                                                      control_dynamics=B,
+                                                                      control_weight=R,
+                                                                      P_seq=P_seq,
+                                                                      R_tilde_seq=R_tilde_seq,
+                                                                      K_seq=K_seq,
+                                                                      A_bar_seq=A_bar_seq,
+                                                                      R_tilde_chol_seq=offline.R_tilde_chol_seq,
+                                                                      K_R_seq=offline.K_R_seq,
+                                                                      A_bar_P_B_seq=offline.A_bar_P_B_seq)
+        error = np.linalg.norm(z_online_part_factors - z_online_part, np.inf)
+        self.assertAlmostEqual(error, 0, delta=tol)
+
+        # with a reusable workspace, writing into a caller buffer or into w itself
+        workspace = core_online.ProximalOnlineWorkspace(prediction_horizon, proximal_lambda, A, B, R, P_seq,
+                                                        R_tilde_seq, K_seq, A_bar_seq, offline.R_tilde_chol_seq,
+                                                        offline.K_R_seq, offline.A_bar_P_B_seq)
+        out = np.zeros((n_z, 1))
+        z_workspace = workspace.proximal(initial_state, z0, out=out)
+        self.assertIs(out, z_workspace)
+        self.assertAlmostEqual(np.linalg.norm(z_workspace - z_online_part, np.inf), 0, delta=tol)
+        w = z0.copy()
+        workspace.proximal(initial_state, w, out=w)
+        self.assertAlmostEqual(np.linalg.norm(w - z_online_part, np.inf), 0, delta=tol)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+import cpasocp as cpa
+import cpasocp.core.sets as core_sets
+
+
+class TestParametricSolver(unittest.TestCase):
+    prediction_horizon = 10
+    n_x = 3
+    n_u = 2
+    A = np.array([[0.9, 0.2, 0], [-0.2, 0.9, 0.1], [0, 0.1, 0.8]])
+    B = np.array([[1, 0], [0, 1], [0.5, 0.5]])
+    Q = 10 * np.eye(n_x)
+    R = np.eye(n_u)
+    P = 5 * np.eye(n_x)
+    rectangle = core_sets.Rectangle(rect_min=[-1] * (n_x + n_u), rect_max=[1] * (n_x + n_u))
+    stage_sets = core_sets.Cartesian([rectangle] * prediction_horizon)
+    terminal_set = core_sets.Rectangle(rect_min=[-1] * n_x, rect_max=[1] * n_x)
+    n_z = (prediction_horizon + 1) * n_x + prediction_horizon * n_u
+    epsilon = 1e-5
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+
+    def __problem(self):
+        return cpa.core.CPASOCP(self.prediction_horizon) \
+            .with_dynamics(self.A, self.B) \
+            .with_cost("Quadratic", self.Q, self.R, self.P) \
+            .with_constraints("Rectangle", self.stage_sets, self.terminal_set)
+
+    def test_parametric_solver(self):
+        z0 = np.zeros((self.n_z, 1))
+        eta0 = np.zeros((self.n_z, 1))
+        for method in ["chambolle_pock", "admm"]:
+            solver = self.__problem().solver(method, self.epsilon)
+            for initial_state in [np.array([0.5, -0.2, 0.1]), np.array([-0.3, 0.4, 0.6])]:
+                reference = getattr(self.__problem(), method)(self.epsilon, initial_state, z0, eta0)
+                solver.solve(initial_state)
+                self.assertTrue(np.array_equal(solver.z, reference.z))
+                self.assertEqual(solver.status, reference.status)
+                self.assertEqual(solver.alpha, reference.alpha)
+        with self.assertRaises(ValueError):
+            self.__problem().solver("unknown", self.epsilon)
+
+    def test_chambolle_pock_batch(self):
+        initial_states = np.array([[0.5, -0.3, 0.9, 0.0], [-0.2, 0.4, -0.9, 0.0], [0.1, 0.6, 0.2, 0.0]])
+        z0 = np.zeros((self.n_z, 1))
+        eta0 = np.zeros((self.n_z, 1))
+        batch = self.__problem().chambolle_pock_batch(self.epsilon, initial_states, z0, eta0)
+        solver = self.__problem().solver("chambolle_pock_batch", self.epsilon).solve(initial_states)
+        self.assertEqual(batch.z.shape, (self.n_z, 4))
+        self.assertTrue(np.array_equal(solver.z, batch.z))
+        for k in range(initial_states.shape[1]):
+            single = self.__problem().solver("chambolle_pock", self.epsilon).solve(initial_states[:, k])
+            self.assertTrue(np.allclose(batch.z[:, k: k + 1], single.z, atol=1e-10))
+            self.assertEqual(solver.iterations[k], single.iterations)
+            self.assertEqual(batch.status[k], single.status)
+
+    def test_receding_horizon(self):
+        N = self.prediction_horizon
+        n_s = self.n_x + self.n_u
+        solver = self.__problem().solver("chambolle_pock", self.epsilon)
+        solver.solve(np.array([0.5, -0.2, 0.1]))
+        z_shift, eta_shift = solver.shifted_guess()
+        self.assertTrue(np.array_equal(z_shift[0: (N - 1) * n_s], solver.z[n_s: N * n_s]))
+        self.assertTrue(np.array_equal(z_shift[(N - 1) * n_s: (N - 1) * n_s + self.n_x], solver.z[N * n_s:]))
+        self.assertTrue(np.array_equal(z_shift[N * n_s:], solver.z[N * n_s:]))
+        self.assertTrue(np.array_equal(eta_shift[(N - 1) * n_s: N * n_s], solver.eta[(N - 1) * n_s: N * n_s]))
+
+        initial_state = np.array([0.8, -0.5, 0.3])
+        num_steps = 8
+        cold = cpa.core.RecedingHorizonController(self.__problem().solver("chambolle_pock", self.epsilon), False) \
+            .simulate(initial_state, num_steps)
+        warm = cpa.core.RecedingHorizonController(solver, True).simulate(initial_state, num_steps)
+        self.assertEqual(warm.states.shape, (num_steps + 1, self.n_x))
+        self.assertEqual(warm.inputs.shape, (num_steps, self.n_u))
+        self.assertEqual(warm.latencies.shape, (num_steps,))
+        self.assertTrue(np.allclose(warm.states, cold.states, atol=1e-3))
+        self.assertLessEqual(warm.iterations[1:].sum(), cold.iterations[1:].sum())
+
+
+if __name__ == '__main__':
+    unittest.main()
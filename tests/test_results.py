@@ -159,6 +159,50 @@ class TestADMM(unittest.TestCase):
         plt.legend()
         plt.show()
 
+    def test_relaxation(self):
+        tol = 1e-3
+        problem = cpa.core.CPASOCP(TestADMM.prediction_horizon) \
+            .with_dynamics(TestADMM.A, TestADMM.B) \
+            .with_cost(TestADMM.cost_type, TestADMM.Q, TestADMM.R, TestADMM.P) \
+            .with_constraints(TestADMM.constraints_type, TestADMM.stage_sets, TestADMM.terminal_set)
+        for method in ["chambolle_pock", "admm"]:
+            iterations = []
+            for relaxation in [1., 1.5]:
+                solution = getattr(problem, method)(TestADMM.epsilon, TestADMM.initial_state, TestADMM.z0,
+                                                    TestADMM.eta0, relaxation=relaxation)
+                error = np.linalg.norm(solution.z - TestADMM.z_cvxpy, np.inf)
+                self.assertEqual(solution.status, cpa.core.STATUS_CONVERGED)
+                self.assertAlmostEqual(error, 0, delta=tol)
+                iterations.append(solution.residuals_cache.shape[0])
+            print(method, 'iterations without and with relaxation:', iterations)
+            self.assertLess(iterations[1], iterations[0])
+            with self.assertRaises(ValueError):
+                getattr(problem, method)(TestADMM.epsilon, TestADMM.initial_state, TestADMM.z0, TestADMM.eta0,
+                                         relaxation=2.)
+
+    def test_cp_accelerated(self):
+        tol = 1e-3
+        problem = cpa.core.CPASOCP(TestADMM.prediction_horizon) \
+            .with_dynamics(TestADMM.A, TestADMM.B) \
+            .with_cost(TestADMM.cost_type, TestADMM.Q, TestADMM.R, TestADMM.P) \
+            .with_constraints(TestADMM.constraints_type, TestADMM.stage_sets, TestADMM.terminal_set)
+        solution_CP = problem.chambolle_pock(TestADMM.epsilon, TestADMM.initial_state, TestADMM.z0, TestADMM.eta0)
+        iterations_CP = solution_CP.residuals_cache.shape[0]
+        for restart in ["residual", "gradient"]:
+            solution = problem.cp_accelerated(TestADMM.epsilon, TestADMM.initial_state, TestADMM.z0, TestADMM.eta0,
+                                              restart)
+            error = np.linalg.norm(solution.z - TestADMM.z_cvxpy, np.inf)
+            iterations = solution.residuals_cache.shape[0]
+            print(restart, 'restart iterations:', iterations, 'CP iterations:', iterations_CP)
+            self.assertEqual(solution.status, cpa.core.STATUS_CONVERGED)
+            self.assertAlmostEqual(error, 0, delta=tol)
+            self.assertLess(iterations, iterations_CP)
+        with self.assertRaises(ValueError):
+            problem.cp_accelerated(TestADMM.epsilon, TestADMM.initial_state, TestADMM.z0, TestADMM.eta0, "unknown")
+        with self.assertRaises(ValueError):
+            problem.cp_accelerated(TestADMM.epsilon, TestADMM.initial_state, TestADMM.z0, TestADMM.eta0, "residual",
+                                   1.)
+
 
 if __name__ == '__main__':
     unittest.main()
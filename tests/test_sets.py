@@ -44,6 +44,102 @@ class TestSets(unittest.TestCase):
                                      samples[i].reshape((TestSets.__set_dimension,))
                                      - projection.reshape((TestSets.__set_dimension,))) <= 0)
 
+    def test_rectangle_bounds(self):
+        rectangle = core_sets.Rectangle(rect_min=[-1, -2, -3, 0], rect_max=[1, 2, 3, 1])
+        vector = np.array([[-5.], [1.], [4.]])
+        projection = rectangle.project(vector)
+        self.assertTrue(np.array_equal(projection, np.array([[-1.], [1.], [3.]])))
+        self.assertEqual(rectangle.rect_min, [-1, -2, -3, 0])
+
+        # matrices are projected column by column, out may be the input itself
+        matrix = 10 * np.random.randn(3, 5)
+        expected = np.hstack([rectangle.project(matrix[:, k: k + 1]) for k in range(5)])
+        rectangle.project(matrix, out=matrix)
+        self.assertTrue(np.array_equal(matrix, expected))
+
+        # bounds are checked when the set is created
+        with self.assertRaises(ValueError):
+            core_sets.Rectangle(rect_min=[0, 2], rect_max=[1, 1])
+        with self.assertRaises(ValueError):
+            core_sets.Rectangle(rect_min=2, rect_max=[3, 1])
+        with self.assertRaises(ValueError):
+            core_sets.Rectangle(rect_min=1, rect_max=0)
+
+    def test_cartesian_project_stacked(self):
+        num_sets = 6
+        n = 4
+        cartesians = [core_sets.Cartesian([core_sets.Rectangle(rect_min=[-1, -2, 0, -1], rect_max=1)] * num_sets),
+                      core_sets.Cartesian([core_sets.Ball(radius=2)] * num_sets),
+                      core_sets.Cartesian([core_sets.SecondOrderCone()] * num_sets),
+                      core_sets.Cartesian([core_sets.NonnegativeOrthant()] * num_sets),
+                      core_sets.Cartesian([core_sets.Ball(), core_sets.Rectangle(rect_min=-1, rect_max=1)] * 3)]
+        for cartesian in cartesians:
+            vector = 3 * np.random.randn(num_sets * n, 1)
+            vector[n: 2 * n] = 0  # zero block
+            vector[3 * n - 1] = 10 * np.linalg.norm(vector[2 * n: 3 * n - 1])  # inside the cone
+            vector[4 * n - 1] = -10 * np.linalg.norm(vector[3 * n: 4 * n - 1])  # inside the polar cone
+            expected = cartesian.project([vector[i * n: (i + 1) * n] for i in range(num_sets)])
+            self.assertTrue(np.allclose(cartesian.project_stacked(vector), expected, rtol=1e-14, atol=1e-14))
+            matrix = np.hstack((vector, 2 * vector))
+            projection = cartesian.project_stacked(matrix)
+            self.assertTrue(np.allclose(projection[:, 0:1], expected, rtol=1e-14, atol=1e-14))
+            self.assertTrue(np.allclose(projection[:, 1:2], cartesian.project_stacked(2 * vector),
+                                        rtol=1e-14, atol=1e-14))
+            cartesian.project_stacked(matrix, out=matrix)
+            self.assertTrue(np.array_equal(matrix, projection))
+        with self.assertRaises(ValueError):
+            cartesians[0].project_stacked(np.ones((num_sets * n + 1, 1)))
+
+    def test_project_batch(self):
+        k = 50
+        n = 5
+        for set_ in [core_sets.Ball(radius=1.5), core_sets.SecondOrderCone()]:
+            vectors = 3 * np.random.randn(k, n)
+            vectors[0] = 0
+            vectors[1, -1] = 10 * np.linalg.norm(vectors[1, 0:-1])
+            vectors[2, -1] = -10 * np.linalg.norm(vectors[2, 0:-1])
+            expected = np.vstack([set_.project(vectors[i].reshape((n, 1))).T for i in range(k)])
+            self.assertTrue(np.allclose(set_.project_batch(vectors), expected, rtol=1e-14, atol=1e-14))
+            set_.project_batch(vectors, out=vectors)
+            self.assertTrue(np.allclose(vectors, expected, rtol=1e-14, atol=1e-14))
+            with self.assertRaises(ValueError):
+                set_.project_batch(np.ones((k, n + 1)))
+
+        # mixed products are projected in groups of one type
+        cartesian = core_sets.Cartesian([core_sets.SecondOrderCone(dimension=3), core_sets.Real(dimension=2),
+                                         core_sets.Ball(dimension=3), core_sets.SecondOrderCone(dimension=4),
+                                         core_sets.SecondOrderCone(dimension=3)])
+        dimensions = [3, 2, 3, 4, 3]
+        matrix = 3 * np.random.randn(sum(dimensions), 4)
+        projection = cartesian.project_stacked(matrix)
+        offsets = np.cumsum([0] + dimensions)
+        for j in range(4):
+            expected = cartesian.project([matrix[offsets[i]: offsets[i + 1], j: j + 1] for i in range(5)])
+            self.assertTrue(np.allclose(projection[:, j: j + 1], expected, rtol=1e-14, atol=1e-14))
+
+    def test_project_out(self):
+        n = 6
+        sets = [core_sets.Rectangle(rect_min=-1, rect_max=1), core_sets.Ball(), core_sets.Real(), core_sets.Zero(),
+                core_sets.NonnegativeOrthant(), core_sets.SecondOrderCone()]
+        for set_ in sets:
+            for vector in [3 * np.random.randn(n, 1), np.vstack((np.random.randn(n - 1, 1), [[10.]])),
+                           np.vstack((np.random.randn(n - 1, 1), [[-10.]]))]:
+                expected = set_.project(vector)
+                out = np.empty((n, 1))
+                self.assertIs(set_.project(vector, out=out), out)
+                self.assertTrue(np.array_equal(out, expected))
+                set_.project(vector, out=vector)
+                self.assertTrue(np.array_equal(vector, expected))
+
+        cartesian = core_sets.Cartesian([core_sets.Ball(), core_sets.Rectangle(rect_min=-1, rect_max=1)])
+        vector = 3 * np.random.randn(2 * n, 1)
+        expected = cartesian.project([vector[0:n], vector[n:]])
+        out = np.empty((2 * n, 1))
+        self.assertIs(cartesian.project([vector[0:n], vector[n:]], out=out), out)
+        self.assertTrue(np.array_equal(out, expected))
+        cartesian.project([vector[0:n], vector[n:]], out=vector)
+        self.assertTrue(np.array_equal(vector, expected))
+
     def test_ball_project(self):
         # create set
         set_type = "Ball"
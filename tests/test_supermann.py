@@ -271,6 +271,37 @@ class TestSuperMann(unittest.TestCase):
         plt.legend()
         plt.show()
 
+    def test_supermann_time_budget(self):
+        # the line search checks the time budget too, the first step falls back to the plain step T x
+        solution = cpa.core.CPASOCP(TestSuperMann.prediction_horizon) \
+            .with_dynamics(TestSuperMann.A, TestSuperMann.B) \
+            .with_cost(TestSuperMann.cost_type, TestSuperMann.Q, TestSuperMann.R, TestSuperMann.P) \
+            .with_constraints(TestSuperMann.constraints_type, TestSuperMann.stage_sets, TestSuperMann.terminal_set) \
+            .cp_suppermann(TestSuperMann.epsilon, TestSuperMann.initial_state, TestSuperMann.z0, TestSuperMann.eta0, 3,
+                           0.99, 0.99, 0.99, 0.5, 0.1, 1.95, time_budget=1e-9)
+        self.assertEqual(solution.status, cpa.core.STATUS_TIME_BUDGET)
+        self.assertEqual(solution.residuals_cache.shape[0], 1)
+
+    def test_supermann_long_horizon(self):
+        # n_z = 5003, the matrix-free SuperMann metric avoids a dense (2 n_z, 2 n_z) operator
+        prediction_horizon = 1000
+        n_x = 3
+        n_u = 2
+        A = np.array([[0.9, 0.2, 0], [-0.2, 0.9, 0.1], [0, 0.1, 0.8]])
+        B = np.array([[1, 0], [0, 1], [0.5, 0.5]])
+        rectangle = core_sets.Rectangle(rect_min=[-1] * (n_x + n_u), rect_max=[1] * (n_x + n_u))
+        terminal_set = core_sets.Rectangle(rect_min=[-1] * n_x, rect_max=[1] * n_x)
+        problem = cpa.core.CPASOCP(prediction_horizon) \
+            .with_dynamics(A, B) \
+            .with_cost("Quadratic", 10 * np.eye(n_x), np.eye(n_u), 5 * np.eye(n_x)) \
+            .with_constraints("Rectangle", core_sets.Cartesian([rectangle] * prediction_horizon), terminal_set)
+        initial_state = np.array([0.5, -0.2, 0.1])
+        epsilon = 1e-5
+        reference = problem.solver("chambolle_pock", epsilon).solve(initial_state)
+        supermann = problem.solver("cp_suppermann", epsilon, 3, 0.99, 0.99, 0.99, 0.5, 0.1, 1.5).solve(initial_state)
+        self.assertEqual(supermann.status, cpa.core.STATUS_CONVERGED)
+        self.assertTrue(np.allclose(supermann.z, reference.z, atol=1e-4))
+
 
 if __name__ == '__main__':
     unittest.main()